@@ -2,18 +2,39 @@
 
 import asyncio
 import logging
-from typing import Optional
+import re
+import signal
+import time
+import typing
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any, Dict, List, Optional, Tuple
 
 from aiogram import Bot, Dispatcher, types
-from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Poll
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.filters import BaseFilter, Command
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, MessageEntity, Poll
 from aiogram import F
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 from config import config
-from database import db_manager
+from database import Question, db_manager
 from google_sheets import sheets_client
 from quiz_logic import quiz_manager
+from rate_limiter import RateLimitMiddleware, send_limiter
 from scheduler import daily_scheduler
 
 # Configure logging
@@ -23,37 +44,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _create_session() -> AiohttpSession:
+    """Create the Bot API session, using orjson for payloads when installed."""
+    if not ORJSON_AVAILABLE:
+        return AiohttpSession()
+    return AiohttpSession(
+        json_loads=orjson.loads,
+        json_dumps=lambda obj: orjson.dumps(obj).decode()
+    )
+
+
 # Initialize bot and dispatcher
-bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
+bot = Bot(token=config.TELEGRAM_BOT_TOKEN, session=_create_session())
+# Every chat send and edit, including message.answer()/reply(), goes through the limiter
+bot.session.middleware(RateLimitMiddleware(send_limiter))
 dp = Dispatcher()
 
+# Keywords that make the bot react to group messages and channel posts
+GROUP_KEYWORDS = r"quiz|practice|continue|next question"
+CHANNEL_KEYWORDS_RE = re.compile(r"quiz|practice|learn|english|question", re.IGNORECASE)
 
-@dp.message(Command("start"))
-async def cmd_start(message: types.Message):
-    """Handle /start command with optional parameters."""
-    user_id = message.from_user.id
-    username = message.from_user.username
-    
-    # Create or update user in database
-    await db_manager.create_or_update_user(user_id, username)
-    
-    # Check if there's a start parameter (from channel buttons)
-    command_args = message.text.split()[1:] if len(message.text.split()) > 1 else []
+# **bold** and `code` spans in static message texts
+_MARKUP_RE = re.compile(r"\*\*(.+?)\*\*|`(.+?)`")
+
+
+def render_markup(markup: str) -> Tuple[str, List[MessageEntity]]:
+    """Turn **bold** and `code` spans into plain text plus message entities.
     
-    if command_args:
-        start_param = command_args[0]
+    Static messages are sent with precomputed entities instead of
+    parse_mode, so Telegram doesn't have to parse them on every send.
+    Entity offsets and lengths count UTF-16 code units, as Telegram expects.
+    """
+    parts = []
+    entities = []
+    offset = 0
+    last_end = 0
+    for match in _MARKUP_RE.finditer(markup):
+        before = markup[last_end:match.start()]
+        parts.append(before)
+        offset += len(before.encode('utf-16-le')) // 2
         
-        if start_param == "practice":
-            # User clicked "Start Practice" from channel
-            await cmd_practice(message)
-            return
-        elif start_param == "stats":
-            # User clicked "View Stats" from channel
-            await cmd_stats(message)
-            return
+        span = match.group(1) if match.group(1) is not None else match.group(2)
+        length = len(span.encode('utf-16-le')) // 2
+        entity_type = "bold" if match.group(1) is not None else "code"
+        entities.append(MessageEntity(type=entity_type, offset=offset, length=length))
+        parts.append(span)
+        offset += length
+        last_end = match.end()
     
-    # Default welcome message
-    welcome_text = """
+    parts.append(markup[last_end:])
+    return "".join(parts), entities
+
+
+# Static message texts, built once at import time
+WELCOME_TEXT = """
 🎯 **Welcome to the English Quiz Bot!**
 
 I'm here to help you improve your English through daily practice quizzes. Here's what I can do:
@@ -72,8 +117,184 @@ Ready to start learning? Use `/practice` to begin your first quiz!
 
 Good luck! 🍀
 """
+
+WELCOME_TEXT, WELCOME_ENTITIES = render_markup(WELCOME_TEXT.strip())
+
+DAILY_START_TEXT, DAILY_START_ENTITIES = render_markup("🌟 **Starting your daily quiz!**")
+DAILY_DONE_TEXT, DAILY_DONE_ENTITIES = render_markup(
+    "✅ **Daily quiz completed!**\n\n"
+    "Want to practice more? Choose an option below:"
+)
+TOPICS_TEXT, TOPICS_ENTITIES = render_markup(
+    "📚 **Available Topics:**\n\n"
+    "Choose a topic to start practicing:"
+)
+CHOOSE_TOPIC_TEXT, CHOOSE_TOPIC_ENTITIES = render_markup("📚 **Choose a topic for practice:**")
+PRACTICE_START_TEXT, PRACTICE_START_ENTITIES = render_markup("💪 **Starting practice session!**")
+
+STATS_TEMPLATE = """
+📊 **Your Learning Statistics**
+
+**Today's Progress:**
+• Daily questions: {daily_completed}/{daily_limit}
+• Status: {status}
+
+**Overall Statistics:**
+• Total questions answered: {total_questions}
+• Correct answers: {total_correct}
+• Accuracy: {accuracy:.1f}%
+
+{motivation}
+"""
+
+STATS_SUMMARY_TEMPLATE = """
+📊 **Your Learning Statistics**
+
+**Today's Progress:**
+• Daily questions: {daily_completed}/{daily_limit}
+
+**Overall Statistics:**
+• Total questions answered: {total_questions}
+• Correct answers: {total_correct}
+• Accuracy: {accuracy:.1f}%
+"""
+
+# Telegram rejects poll questions longer than this
+POLL_QUESTION_MAX_LENGTH = 300
+
+# Static keyboards, shared by every message that shows them
+DAILY_DONE_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🚀 Start Practice Session", callback_data="start_practice")],
+    [InlineKeyboardButton(text="📚 Choose Topic", callback_data="choose_topic")]
+])
+
+QUIZ_COMPLETED_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🚀 Practice More", callback_data="start_practice")],
+    [InlineKeyboardButton(text="📊 View Stats", callback_data="view_stats")]
+])
+
+NEXT_QUESTION_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="➡️ Next Question", callback_data="next_question")]
+])
+
+PRACTICE_MORE_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🚀 Practice More", callback_data="start_practice")]
+])
+
+# Recently computed user stats: user_id -> (computed_at, stats)
+STATS_CACHE_TTL = 30.0
+STATS_CACHE_MAX_SIZE = 1000
+_stats_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+# Topic keyboards per callback prefix: prefix -> (topics, keyboard)
+_topic_keyboards: Dict[str, Tuple[Tuple[str, ...], InlineKeyboardMarkup]] = {}
+
+# Text and keyboard last rendered into recently edited messages:
+# (chat_id, message_id) -> (text, reply_markup)
+RENDERED_MESSAGES_MAX_SIZE = 1000
+_rendered_messages: typing.OrderedDict[Tuple[int, int], Tuple[str, Any]] = OrderedDict()
+
+# Bot identity is fixed for the process lifetime, so fetch it once
+_bot_me: Optional[types.User] = None
+_channel_keyboard: Optional[InlineKeyboardMarkup] = None
+
+
+async def get_bot_me() -> types.User:
+    """Return the bot's own user, fetching it from Telegram only once."""
+    global _bot_me
+    if _bot_me is None:
+        _bot_me = await bot.get_me()
+    return _bot_me
+
+
+async def get_channel_keyboard() -> InlineKeyboardMarkup:
+    """Return the deep-link keyboard attached to channel posts, built once per process."""
+    global _channel_keyboard
+    if _channel_keyboard is None:
+        bot_username = (await get_bot_me()).username
+        _channel_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="🎯 Start Practice", url=f"https://t.me/{bot_username}?start=practice")],
+            [InlineKeyboardButton(text="📊 View My Stats", url=f"https://t.me/{bot_username}?start=stats")]
+        ])
+    return _channel_keyboard
+
+
+async def edit_message_text(message: types.Message, text: str, **kwargs) -> bool:
+    """Edit a message's text, skipping the request if it already shows this text and keyboard.
+    
+    Telegram rejects such no-op edits with "message is not modified".
+    Returns False when the edit was skipped.
+    """
+    key = (message.chat.id, message.message_id)
+    rendered = (text, kwargs.get('reply_markup'))
+    if _rendered_messages.get(key) == rendered:
+        _rendered_messages.move_to_end(key)
+        return False
+    
+    await message.edit_text(text, **kwargs)
+    
+    _rendered_messages[key] = rendered
+    _rendered_messages.move_to_end(key)
+    if len(_rendered_messages) > RENDERED_MESSAGES_MAX_SIZE:
+        _rendered_messages.popitem(last=False)
+    return True
+
+
+async def get_cached_user_stats(user_id: int) -> Optional[Dict[str, Any]]:
+    """Return user stats, reusing a result computed in the last STATS_CACHE_TTL seconds."""
+    now = time.monotonic()
+    cached = _stats_cache.get(user_id)
+    if cached and now - cached[0] < STATS_CACHE_TTL:
+        return cached[1]
+    
+    stats = await quiz_manager.get_user_stats(user_id)
+    if stats:
+        if len(_stats_cache) >= STATS_CACHE_MAX_SIZE:
+            # Drop expired entries so the cache doesn't grow with every user seen
+            for key in [k for k, (ts, _) in _stats_cache.items() if now - ts >= STATS_CACHE_TTL]:
+                del _stats_cache[key]
+        _stats_cache[user_id] = (now, stats)
+    return stats
+
+
+def get_topics_keyboard(topics: List[str], callback_prefix: str, include_random: bool = False) -> InlineKeyboardMarkup:
+    """Return a one-button-per-row topic keyboard, rebuilt only when the topics change."""
+    key = tuple(topics)
+    cached = _topic_keyboards.get(callback_prefix)
+    if cached and cached[0] == key:
+        return cached[1]
+    
+    rows = [
+        [InlineKeyboardButton(text=f"📖 {topic}", callback_data=f"{callback_prefix}{topic}")]
+        for topic in topics
+    ]
+    if include_random:
+        rows.append([InlineKeyboardButton(text="🔀 Random Topics", callback_data=f"{callback_prefix}random")])
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=rows)
+    _topic_keyboards[callback_prefix] = (key, keyboard)
+    return keyboard
+
+
+@dp.message(Command("start"))
+async def cmd_start(message: types.Message):
+    """Handle /start command with optional parameters."""
+    user_id = message.from_user.id
+    username = message.from_user.username
+    
+    # Create or update user in database
+    await db_manager.create_or_update_user(user_id, username)
+    
+    # Check if there's a start parameter (from channel buttons)
+    parts = message.text.split(maxsplit=1)
+    if len(parts) > 1:
+        handler = START_PARAM_HANDLERS.get(parts[1].split(maxsplit=1)[0])
+        if handler:
+            await handler(message)
+            return
     
-    await message.answer(welcome_text, parse_mode="Markdown")
+    # Default welcome message
+    await message.answer(WELCOME_TEXT, entities=WELCOME_ENTITIES)
 
 
 @dp.message(Command("practice"))
@@ -82,14 +303,11 @@ async def cmd_practice(message: types.Message):
     user_id = message.from_user.id
     
     try:
-        # Check if user has an active session
-        active_session = quiz_manager.get_active_session(user_id)
-        if active_session:
-            # Continue current session
-            current_question = quiz_manager.get_current_question(user_id)
-            if current_question:
-                await send_question(message, current_question, active_session)
-                return
+        # Continue the current session if the user has one
+        active_session, current_question = quiz_manager.get_active_session_with_question(user_id)
+        if current_question:
+            await send_question(message, current_question, active_session)
+            return
         
         # Check if user can start daily quiz
         can_start_daily = await quiz_manager.can_start_daily_quiz(user_id)
@@ -100,7 +318,7 @@ async def cmd_practice(message: types.Message):
             if session:
                 current_question = quiz_manager.get_current_question(user_id)
                 if current_question:
-                    await message.answer("🌟 **Starting your daily quiz!**\n", parse_mode="Markdown")
+                    await message.answer(DAILY_START_TEXT, entities=DAILY_START_ENTITIES)
                     await send_question(message, current_question, session)
                 else:
                     await message.answer("❌ Sorry, I couldn't prepare your quiz. Please try again later.")
@@ -108,16 +326,10 @@ async def cmd_practice(message: types.Message):
                 await message.answer("❌ Sorry, I couldn't start your quiz. Please try again later.")
         else:
             # Offer practice session
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🚀 Start Practice Session", callback_data="start_practice")],
-                [InlineKeyboardButton(text="📚 Choose Topic", callback_data="choose_topic")]
-            ])
-            
             await message.answer(
-                "✅ **Daily quiz completed!**\n\n"
-                "Want to practice more? Choose an option below:",
-                reply_markup=keyboard,
-                parse_mode="Markdown"
+                DAILY_DONE_TEXT,
+                entities=DAILY_DONE_ENTITIES,
+                reply_markup=DAILY_DONE_KEYBOARD
             )
     
     except Exception as e:
@@ -135,24 +347,10 @@ async def cmd_topics(message: types.Message):
             await message.answer("📚 No topics available at the moment. Please try again later.")
             return
         
-        # Create keyboard with topics
-        keyboard = InlineKeyboardBuilder()
-        for topic in topics:
-            keyboard.row(InlineKeyboardButton(
-                text=f"📖 {topic}", 
-                callback_data=f"topic_{topic}"
-            ))
-        
-        keyboard.row(InlineKeyboardButton(
-            text="🔀 Random Topics", 
-            callback_data="topic_random"
-        ))
-        
         await message.answer(
-            "📚 **Available Topics:**\n\n"
-            "Choose a topic to start practicing:",
-            reply_markup=keyboard.as_markup(),
-            parse_mode="Markdown"
+            TOPICS_TEXT,
+            entities=TOPICS_ENTITIES,
+            reply_markup=get_topics_keyboard(topics, "topic_", include_random=True)
         )
     
     except Exception as e:
@@ -165,26 +363,20 @@ async def cmd_stats(message: types.Message):
     """Handle /stats command."""
     try:
         user_id = message.from_user.id
-        stats = await quiz_manager.get_user_stats(user_id)
+        stats = await get_cached_user_stats(user_id)
         
         if not stats:
             await message.answer("📊 No statistics available yet. Start practicing to see your progress!")
             return
         
-        stats_text = f"""
-📊 **Your Learning Statistics**
-
-**Today's Progress:**
-• Daily questions: {stats['daily_completed']}/{stats['daily_limit']}
-• Status: {'✅ Completed' if stats['can_practice_more'] else '⏳ In progress'}
-
-**Overall Statistics:**
-• Total questions answered: {stats['total_questions']}
-• Correct answers: {stats['total_correct']}
-• Accuracy: {stats['accuracy']:.1f}%
-
-{'💪 Great job! Keep practicing to improve your score!' if stats['accuracy'] >= 70 else '📈 Keep practicing to boost your accuracy!'}
-"""
+        stats_text = STATS_TEMPLATE.format(
+            **stats,
+            status='✅ Completed' if stats['can_practice_more'] else '⏳ In progress',
+            motivation=(
+                '💪 Great job! Keep practicing to improve your score!' if stats['accuracy'] >= 70
+                else '📈 Keep practicing to boost your accuracy!'
+            )
+        )
         
         await message.answer(stats_text, parse_mode="Markdown")
     
@@ -193,68 +385,71 @@ async def cmd_stats(message: types.Message):
         await message.answer("❌ An error occurred while fetching your statistics.")
 
 
-@dp.message(F.text & F.chat.type.in_(["group", "supergroup"]) & ~F.text.startswith("/"))
+# Deep-link /start parameters used by the channel buttons
+START_PARAM_HANDLERS = {
+    "practice": cmd_practice,  # "Start Practice"
+    "stats": cmd_stats,        # "View My Stats"
+}
+
+
+class GroupTriggerFilter(BaseFilter):
+    """Pass group messages that mention the bot, reply to it, or use a quiz keyword."""
+    
+    def __init__(self):
+        # Built on first use, once the bot username is known
+        self._trigger_re: Optional[re.Pattern] = None
+    
+    async def __call__(self, message: types.Message) -> bool:
+        bot_info = await get_bot_me()
+        if self._trigger_re is None:
+            self._trigger_re = re.compile(
+                rf"@{re.escape(bot_info.username or '')}\b|{GROUP_KEYWORDS}", re.IGNORECASE
+            )
+        
+        if self._trigger_re.search(message.text):
+            return True
+        
+        reply = message.reply_to_message
+        return bool(reply and reply.from_user and reply.from_user.id == bot_info.id)
+
+
+# Only respond if bot is explicitly mentioned or specific keywords are used
+@dp.message(
+    F.chat.type.in_({"group", "supergroup"}),
+    F.text,
+    ~F.text.startswith("/"),
+    GroupTriggerFilter()
+)
 async def handle_group_messages(message: types.Message):
     """Handle non-command messages in groups and supergroups - look for bot mentions or continuing quiz sessions."""
     try:
         user_id = message.from_user.id
-        text = message.text.lower() if message.text else ""
-        
-        # Get bot info to check for mentions
-        bot_info = await bot.get_me()
-        bot_username = bot_info.username.lower()
-        
-        # Only respond if bot is explicitly mentioned or specific keywords are used
-        is_bot_mentioned = (
-            f"@{bot_username}" in text or
-            message.reply_to_message and message.reply_to_message.from_user.id == bot_info.id
-        )
-        
-        # Or if user types specific quiz-related keywords
-        quiz_keywords = ["quiz", "practice", "continue", "next question"]
-        has_quiz_keywords = any(keyword in text for keyword in quiz_keywords)
-        
-        if not (is_bot_mentioned or has_quiz_keywords):
-            return  # Ignore other group messages
         
         # Check if user has an active session
-        active_session = quiz_manager.get_active_session(user_id)
+        active_session, current_question = quiz_manager.get_active_session_with_question(user_id)
         
         if active_session:
             # User has active session - continue quiz
-            current_question = quiz_manager.get_current_question(user_id)
             if current_question:
                 await send_question_to_user(user_id, current_question, active_session)
-                await message.reply("📱 Next question sent to your private messages!", parse_mode="Markdown")
+                await message.reply("📱 Next question sent to your private messages!")
             else:
-                await message.reply("✅ Quiz completed! Use /practice to start a new one.", parse_mode="Markdown")
+                await message.reply("✅ Quiz completed! Use /practice to start a new one.")
         else:
             # No active session - suggest starting
-            await message.reply("👋 Hi! Use /practice to start a quiz.", parse_mode="Markdown")
+            await message.reply("👋 Hi! Use /practice to start a quiz.")
     
     except Exception as e:
         logger.error(f"Error handling group message: {e}")
 
 
-@dp.channel_post()
+# Only handle posts that mention quiz or practice
+@dp.channel_post(F.text.regexp(CHANNEL_KEYWORDS_RE, mode="search"))
 async def handle_channel_posts(channel_post: types.Message):
     """Handle channel posts - add inline buttons for users to interact."""
     try:
-        # Only handle posts that mention quiz or practice
-        if not channel_post.text:
-            return
-            
-        text = channel_post.text.lower()
-        quiz_keywords = ["quiz", "practice", "learn", "english", "question"]
-        
-        if not any(keyword in text for keyword in quiz_keywords):
-            return
-        
         # Add inline keyboard for users to start practicing
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🎯 Start Practice", url=f"https://t.me/{(await bot.get_me()).username}?start=practice")],
-            [InlineKeyboardButton(text="📊 View My Stats", url=f"https://t.me/{(await bot.get_me()).username}?start=stats")]
-        ])
+        keyboard = await get_channel_keyboard()
         
         # Edit the post to add buttons (only works if bot is admin)
         try:
@@ -275,7 +470,6 @@ async def handle_channel_posts(channel_post: types.Message):
         logger.error(f"Error handling channel post: {e}")
 
 
-@dp.callback_query(F.data == "start_practice")
 async def callback_start_practice(callback: types.CallbackQuery):
     """Handle practice session start."""
     try:
@@ -285,12 +479,12 @@ async def callback_start_practice(callback: types.CallbackQuery):
         if session:
             current_question = quiz_manager.get_current_question(user_id)
             if current_question:
-                await callback.message.edit_text("💪 **Starting practice session!**", parse_mode="Markdown")
+                await edit_message_text(callback.message, PRACTICE_START_TEXT, entities=PRACTICE_START_ENTITIES)
                 await send_question(callback.message, current_question, session)
             else:
-                await callback.message.edit_text("❌ Couldn't prepare practice session. Please try again.")
+                await edit_message_text(callback.message, "❌ Couldn't prepare practice session. Please try again.")
         else:
-            await callback.message.edit_text("❌ Couldn't start practice session. Please try again later.")
+            await edit_message_text(callback.message, "❌ Couldn't start practice session. Please try again later.")
         
         await callback.answer()
     
@@ -299,38 +493,29 @@ async def callback_start_practice(callback: types.CallbackQuery):
         await callback.answer("❌ An error occurred.")
 
 
-@dp.callback_query(F.data == "choose_topic")
 async def callback_choose_topic(callback: types.CallbackQuery):
     """Handle topic selection for practice."""
     try:
         topics = await sheets_client.get_topics()
         
         if not topics:
-            await callback.message.edit_text("📚 No topics available at the moment.")
+            await edit_message_text(callback.message, "📚 No topics available at the moment.")
             await callback.answer()
             return
         
-        # Create keyboard with topics
-        keyboard = InlineKeyboardBuilder()
-        for topic in topics:
-            keyboard.row(InlineKeyboardButton(
-                text=f"📖 {topic}", 
-                callback_data=f"practice_topic_{topic}"
-            ))
-        
-        await callback.message.edit_text(
-            "📚 **Choose a topic for practice:**",
-            reply_markup=keyboard.as_markup(),
-            parse_mode="Markdown"
+        edited = await edit_message_text(
+            callback.message,
+            CHOOSE_TOPIC_TEXT,
+            entities=CHOOSE_TOPIC_ENTITIES,
+            reply_markup=get_topics_keyboard(topics, "practice_topic_")
         )
-        await callback.answer()
+        await callback.answer(None if edited else "Already up to date")
     
     except Exception as e:
         logger.error(f"Error in topic selection: {e}")
         await callback.answer("❌ An error occurred.")
 
 
-@dp.callback_query(F.data.startswith("topic_"))
 async def callback_topic_selection(callback: types.CallbackQuery):
     """Handle topic selection from /topics command."""
     try:
@@ -346,12 +531,12 @@ async def callback_topic_selection(callback: types.CallbackQuery):
             current_question = quiz_manager.get_current_question(user_id)
             if current_question:
                 topic_text = f" ({topic})" if topic else " (Random Topics)"
-                await callback.message.edit_text(f"📚 **Starting practice{topic_text}**", parse_mode="Markdown")
+                await edit_message_text(callback.message, f"📚 **Starting practice{topic_text}**", parse_mode="Markdown")
                 await send_question(callback.message, current_question, session)
             else:
-                await callback.message.edit_text("❌ Couldn't prepare quiz. Please try again.")
+                await edit_message_text(callback.message, "❌ Couldn't prepare quiz. Please try again.")
         else:
-            await callback.message.edit_text("❌ Couldn't start quiz. Please try again later.")
+            await edit_message_text(callback.message, "❌ Couldn't start quiz. Please try again later.")
         
         await callback.answer()
     
@@ -360,7 +545,6 @@ async def callback_topic_selection(callback: types.CallbackQuery):
         await callback.answer("❌ An error occurred.")
 
 
-@dp.callback_query(F.data.startswith("practice_topic_"))
 async def callback_practice_topic(callback: types.CallbackQuery):
     """Handle topic-specific practice start."""
     try:
@@ -372,12 +556,12 @@ async def callback_practice_topic(callback: types.CallbackQuery):
         if session:
             current_question = quiz_manager.get_current_question(user_id)
             if current_question:
-                await callback.message.edit_text(f"📚 **Practicing: {topic}**", parse_mode="Markdown")
+                await edit_message_text(callback.message, f"📚 **Practicing: {topic}**", parse_mode="Markdown")
                 await send_question(callback.message, current_question, session)
             else:
-                await callback.message.edit_text("❌ Couldn't prepare quiz. Please try again.")
+                await edit_message_text(callback.message, "❌ Couldn't prepare quiz. Please try again.")
         else:
-            await callback.message.edit_text("❌ Couldn't start quiz. Please try again later.")
+            await edit_message_text(callback.message, "❌ Couldn't start quiz. Please try again later.")
         
         await callback.answer()
     
@@ -396,45 +580,36 @@ async def poll_answer_handler(poll_answer: types.PollAnswer):
         if not option_ids:
             return
         
-        # Convert option index to letter (0->A, 1->B, etc.)
-        selected_option_index = option_ids[0]
-        answer = chr(ord('A') + selected_option_index)
+        # Polls leave out empty options, so map the index back through the current question
+        current_question = quiz_manager.get_current_question(user_id)
+        answer = poll_option_letter(current_question, option_ids[0])
         
         is_correct, feedback_data = await quiz_manager.submit_answer(user_id, answer)
+        _stats_cache.pop(user_id, None)
         
         # Send feedback message
         feedback_text = quiz_manager.format_feedback(feedback_data)
         
         if feedback_data.get('is_quiz_completed'):
             # Quiz completed
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🚀 Practice More", callback_data="start_practice")],
-                [InlineKeyboardButton(text="📊 View Stats", callback_data="view_stats")]
-            ])
-            await bot.send_message(user_id, feedback_text, parse_mode="Markdown", reply_markup=keyboard)
+            await bot.send_message(user_id, feedback_text, parse_mode="Markdown", reply_markup=QUIZ_COMPLETED_KEYBOARD)
         else:
             # Continue to next question - automatically send next question in groups
-            active_session = quiz_manager.get_active_session(user_id)
-            if active_session:
-                current_question = quiz_manager.get_current_question(user_id)
-                if current_question:
-                    # Send feedback first
-                    await bot.send_message(user_id, feedback_text, parse_mode="Markdown")
-                    # Then automatically send next question
-                    await send_question_to_user(user_id, current_question, active_session)
-                    return
+            active_session, current_question = quiz_manager.get_active_session_with_question(user_id)
+            if current_question:
+                # Send feedback first
+                await bot.send_message(user_id, feedback_text, parse_mode="Markdown")
+                # Then automatically send next question
+                await send_question_to_user(user_id, current_question, active_session)
+                return
             
             # Fallback if no active session
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="➡️ Next Question", callback_data="next_question")]
-            ])
-            await bot.send_message(user_id, feedback_text, parse_mode="Markdown", reply_markup=keyboard)
+            await bot.send_message(user_id, feedback_text, parse_mode="Markdown", reply_markup=NEXT_QUESTION_KEYBOARD)
     
     except Exception as e:
         logger.error(f"Error processing poll answer: {e}")
 
 
-@dp.callback_query(F.data.startswith("answer_"))
 async def callback_answer(callback: types.CallbackQuery):
     """Handle answer selection (legacy fallback)."""
     try:
@@ -442,23 +617,17 @@ async def callback_answer(callback: types.CallbackQuery):
         user_id = callback.from_user.id
         
         is_correct, feedback_data = await quiz_manager.submit_answer(user_id, answer)
+        _stats_cache.pop(user_id, None)
         
         # Send feedback
         feedback_text = quiz_manager.format_feedback(feedback_data)
         
         if feedback_data.get('is_quiz_completed'):
             # Quiz completed
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🚀 Practice More", callback_data="start_practice")],
-                [InlineKeyboardButton(text="📊 View Stats", callback_data="view_stats")]
-            ])
-            await callback.message.edit_text(feedback_text, parse_mode="Markdown", reply_markup=keyboard)
+            await edit_message_text(callback.message, feedback_text, parse_mode="Markdown", reply_markup=QUIZ_COMPLETED_KEYBOARD)
         else:
             # Continue to next question
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="➡️ Next Question", callback_data="next_question")]
-            ])
-            await callback.message.edit_text(feedback_text, parse_mode="Markdown", reply_markup=keyboard)
+            await edit_message_text(callback.message, feedback_text, parse_mode="Markdown", reply_markup=NEXT_QUESTION_KEYBOARD)
         
         await callback.answer()
     
@@ -467,23 +636,21 @@ async def callback_answer(callback: types.CallbackQuery):
         await callback.answer("❌ An error occurred.")
 
 
-@dp.callback_query(F.data == "next_question")
 async def callback_next_question(callback: types.CallbackQuery):
     """Handle next question request."""
     try:
         user_id = callback.from_user.id
-        session = quiz_manager.get_active_session(user_id)
+        session, current_question = quiz_manager.get_active_session_with_question(user_id)
         
         if session:
-            current_question = quiz_manager.get_current_question(user_id)
             if current_question:
                 # Delete the feedback message and send new question
                 await callback.message.delete()
                 await send_question(callback.message, current_question, session, edit=False)
             else:
-                await callback.message.edit_text("❌ No more questions available.")
+                await edit_message_text(callback.message, "❌ No more questions available.")
         else:
-            await callback.message.edit_text("❌ No active quiz session found.")
+            await edit_message_text(callback.message, "❌ No active quiz session found.")
         
         await callback.answer()
     
@@ -492,76 +659,103 @@ async def callback_next_question(callback: types.CallbackQuery):
         await callback.answer("❌ An error occurred.")
 
 
-@dp.callback_query(F.data == "view_stats")
 async def callback_view_stats(callback: types.CallbackQuery):
     """Handle stats viewing."""
     try:
         user_id = callback.from_user.id
-        stats = await quiz_manager.get_user_stats(user_id)
+        stats = await get_cached_user_stats(user_id)
         
         if stats:
-            stats_text = f"""
-📊 **Your Learning Statistics**
-
-**Today's Progress:**
-• Daily questions: {stats['daily_completed']}/{stats['daily_limit']}
-
-**Overall Statistics:**
-• Total questions answered: {stats['total_questions']}
-• Correct answers: {stats['total_correct']}
-• Accuracy: {stats['accuracy']:.1f}%
-"""
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🚀 Practice More", callback_data="start_practice")]
-            ])
-            await callback.message.edit_text(stats_text, parse_mode="Markdown", reply_markup=keyboard)
+            stats_text = STATS_SUMMARY_TEMPLATE.format(**stats)
+            edited = await edit_message_text(callback.message, stats_text, parse_mode="Markdown", reply_markup=PRACTICE_MORE_KEYBOARD)
         else:
-            await callback.message.edit_text("📊 No statistics available yet.")
+            edited = await edit_message_text(callback.message, "📊 No statistics available yet.")
         
-        await callback.answer()
+        await callback.answer(None if edited else "Already up to date")
     
     except Exception as e:
         logger.error(f"Error viewing stats: {e}")
         await callback.answer("❌ An error occurred.")
 
 
-async def send_question_to_user(user_id: int, question_data: dict, session):
+# Callback handlers keyed by the first "_"-separated segment of callback data
+CALLBACK_HANDLERS = {
+    "start": callback_start_practice,         # start_practice
+    "choose": callback_choose_topic,          # choose_topic
+    "topic": callback_topic_selection,        # topic_<name>
+    "practice": callback_practice_topic,      # practice_topic_<name>
+    "answer": callback_answer,                # answer_<letter>
+    "next": callback_next_question,           # next_question
+    "view": callback_view_stats,              # view_stats
+}
+
+
+@dp.callback_query()
+async def route_callback(callback: types.CallbackQuery):
+    """Dispatch a callback query to its handler with a single dict lookup."""
+    handler = CALLBACK_HANDLERS.get((callback.data or "").partition("_")[0])
+    if handler is None:
+        await callback.answer()
+        return
+    await handler(callback)
+
+
+def get_poll_options(question_data: Question) -> Tuple[List[str], Optional[int]]:
+    """Return the non-empty answer options and the index of the correct one (None if invalid)."""
+    all_options = question_data.options
+    options = [text for text in all_options if text]
+    
+    correct_answer = question_data.correct_norm
+    letter_index = ord(correct_answer) - ord('A') if len(correct_answer) == 1 else -1
+    if not 0 <= letter_index < len(all_options) or not all_options[letter_index]:
+        return options, None
+    # Empty options are dropped, so count only the non-empty ones before the answer
+    correct_option_id = sum(1 for text in all_options[:letter_index] if text)
+    return options, correct_option_id
+
+
+def poll_option_letter(question_data: Optional[Question], option_index: int) -> str:
+    """Return the answer letter for a poll option index, as laid out by get_poll_options."""
+    if question_data is None:
+        return chr(ord('A') + option_index)
+    letters = [letter for letter, text in zip('ABCD', question_data.options) if text]
+    if not 0 <= option_index < len(letters):
+        return ''
+    return letters[option_index]
+
+
+def format_poll_question(question_data: Question, session) -> str:
+    """Build the poll question text, prefixed with the question number and topic."""
+    text = (
+        f"Q{session.current_question_index + 1}/{len(session.questions)} "
+        f"[{question_data.topic}] {question_data.question}"
+    )
+    if len(text) > POLL_QUESTION_MAX_LENGTH:
+        text = text[:POLL_QUESTION_MAX_LENGTH - 1] + "…"
+    return text
+
+
+async def send_question_to_user(user_id: int, question_data: Question, session):
     """Send a question directly to a user (works in DMs and groups)."""
-    # Format question header
-    question_header = f"❓ **Question {session.current_question_index + 1}/{len(session.questions)}**\n📚 **Topic:** {question_data['topic']}"
-    
     # Prepare poll options
-    options = []
-    option_letters = ['A', 'B', 'C', 'D']
-    correct_option_id = None
-    
-    for i, letter in enumerate(option_letters):
-        option_text = question_data.get(f'option_{letter.lower()}', '')
-        if option_text:
-            options.append(option_text)
-            # Check if this is the correct answer
-            if question_data['correct_answer'].upper() == letter:
-                correct_option_id = i
+    options, correct_option_id = get_poll_options(question_data)
     
     if not options or correct_option_id is None:
         # Fallback to text message
         await bot.send_message(user_id, "❌ Error with question format. Use /practice to try again.")
         return
     
-    # Send header message first
-    await bot.send_message(user_id, question_header, parse_mode="Markdown")
-    
-    # Send poll
+    # Send poll, with the question number and topic in the poll question
     try:
         poll_message = await bot.send_poll(
             chat_id=user_id,
-            question=question_data['question'],
+            question=format_poll_question(question_data, session),
             options=options,
             type="quiz",  # This creates a quiz poll with radio buttons
             correct_option_id=correct_option_id,
             is_anonymous=False,
             allows_multiple_answers=False,
-            explanation=question_data.get('explanation', '') if question_data.get('explanation') else None
+            explanation=question_data.explanation or None
         )
         
     except Exception as e:
@@ -570,51 +764,34 @@ async def send_question_to_user(user_id: int, question_data: dict, session):
         await bot.send_message(user_id, "❌ Error sending question. Use /practice to try again.")
 
 
-async def send_question(message: types.Message, question_data: dict, session, edit: bool = False):
+async def send_question(message: types.Message, question_data: Question, session, edit: bool = False):
     """Send a question using Telegram poll with radio buttons."""
     # For group chats, send to user directly to avoid spam
     # Note: Channels are handled separately by channel_post handler
     if message.chat.type in ['group', 'supergroup']:
         await send_question_to_user(message.from_user.id, question_data, session)
-        await message.reply("📱 Question sent to your private messages!", parse_mode="Markdown")
+        await message.reply("📱 Question sent to your private messages!")
         return
     
-    # Format question header
-    question_header = f"❓ **Question {session.current_question_index + 1}/{len(session.questions)}**\n📚 **Topic:** {question_data['topic']}"
-    
     # Prepare poll options
-    options = []
-    option_letters = ['A', 'B', 'C', 'D']
-    correct_option_id = None
-    
-    for i, letter in enumerate(option_letters):
-        option_text = question_data.get(f'option_{letter.lower()}', '')
-        if option_text:
-            options.append(option_text)
-            # Check if this is the correct answer
-            if question_data['correct_answer'].upper() == letter:
-                correct_option_id = i
+    options, correct_option_id = get_poll_options(question_data)
     
     if not options or correct_option_id is None:
         # Fallback to inline buttons if poll can't be created
         await send_question_fallback(message, question_data, session, edit)
         return
     
-    # Send header message first
-    if not edit:
-        await message.answer(question_header, parse_mode="Markdown")
-    
-    # Send poll
+    # Send poll, with the question number and topic in the poll question
     try:
         poll_message = await bot.send_poll(
             chat_id=message.chat.id,
-            question=question_data['question'],
+            question=format_poll_question(question_data, session),
             options=options,
             type="quiz",  # This creates a quiz poll with radio buttons
             correct_option_id=correct_option_id,
             is_anonymous=False,
             allows_multiple_answers=False,
-            explanation=question_data.get('explanation', '') if question_data.get('explanation') else None
+            explanation=question_data.explanation or None
         )
         
         # Store poll message for potential cleanup later
@@ -626,7 +803,7 @@ async def send_question(message: types.Message, question_data: dict, session, ed
         await send_question_fallback(message, question_data, session, edit)
 
 
-async def send_question_fallback(message: types.Message, question_data: dict, session, edit: bool = False):
+async def send_question_fallback(message: types.Message, question_data: Question, session, edit: bool = False):
     """Fallback method using inline buttons if polls fail."""
     question_text = quiz_manager.format_question(
         question_data, 
@@ -634,22 +811,69 @@ async def send_question_fallback(message: types.Message, question_data: dict, se
         len(session.questions)
     )
     
-    # Create answer buttons
-    keyboard = InlineKeyboardBuilder()
-    options = ['A', 'B', 'C', 'D']
-    
-    for option in options:
-        option_text = question_data.get(f'option_{option.lower()}', '')
-        if option_text:
-            keyboard.row(InlineKeyboardButton(
-                text=f"{option}. {option_text[:30]}{'...' if len(option_text) > 30 else ''}", 
-                callback_data=f"answer_{option}"
-            ))
+    # Create answer buttons, one per row
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text=f"{option}. {option_text[:30]}{'...' if len(option_text) > 30 else ''}", 
+            callback_data=f"answer_{option}"
+        )]
+        for option, option_text in zip('ABCD', question_data.options)
+        if option_text
+    ])
     
     if edit:
-        await message.edit_text(question_text, reply_markup=keyboard.as_markup(), parse_mode="Markdown")
+        await edit_message_text(message, question_text, reply_markup=keyboard, parse_mode="Markdown")
     else:
-        await message.answer(question_text, reply_markup=keyboard.as_markup(), parse_mode="Markdown")
+        await message.answer(question_text, reply_markup=keyboard, parse_mode="Markdown")
+
+
+# Signals that shut the bot down cleanly in webhook mode
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+async def run_webhook():
+    """Receive updates through an aiohttp webhook endpoint until SIGINT/SIGTERM.
+    
+    Returns on a stop signal, like start_polling does, so main() can stop
+    the scheduler and close the database on the way out.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.WEBHOOK_SECRET or None
+    ).register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in STOP_SIGNALS:
+        # Signal handlers aren't supported by the Windows event loop
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(signum, stop.set)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, config.WEBAPP_HOST, config.WEBAPP_PORT)
+        await site.start()
+        
+        webhook_url = config.WEBHOOK_URL.rstrip('/') + config.WEBHOOK_PATH
+        await bot.set_webhook(
+            webhook_url,
+            secret_token=config.WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Webhook set to {webhook_url}, listening on {config.WEBAPP_HOST}:{config.WEBAPP_PORT}")
+        
+        # Serve until a stop signal arrives
+        await stop.wait()
+        logger.info("Stopping webhook server")
+    finally:
+        for signum in STOP_SIGNALS:
+            with suppress(NotImplementedError):
+                loop.remove_signal_handler(signum)
+        await runner.cleanup()
 
 
 async def main():
@@ -675,21 +899,32 @@ async def main():
     logger.info("Bot is starting...")
     
     try:
-        # Start polling
-        await dp.start_polling(bot)
+        # Cache bot identity and the channel keyboard before handling updates
+        await get_channel_keyboard()
+        
+        if config.WEBHOOK_URL:
+            # Telegram pushes updates to us
+            await run_webhook()
+        else:
+            # Drop any webhook left from a webhook run, or getUpdates fails with 409 Conflict
+            await bot.delete_webhook()
+            # Start polling
+            await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Error running bot: {e}")
     finally:
         # Cleanup
         await daily_scheduler.stop()
         await db_manager.close()
-        sheets_client.close()
         await bot.session.close()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if UVLOOP_AVAILABLE:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
@@ -20,10 +20,19 @@ class Config:
     
     # Database Configuration
     DATABASE_PATH: str = os.getenv('DATABASE_PATH', 'quiz_bot.db')
+    DATABASE_READ_POOL_SIZE: int = int(os.getenv('DATABASE_READ_POOL_SIZE', '4'))  # 0 = read on the writer
     
     # Questions Configuration
     QUESTIONS_DIRECTORY: str = os.getenv('QUESTIONS_DIRECTORY', 'questions')
     DATA_SOURCE: str = os.getenv('DATA_SOURCE', 'auto')  # 'auto', 'csv', 'sheets'
+    QUESTIONS_CACHE_TTL: float = float(os.getenv('QUESTIONS_CACHE_TTL', '600'))  # Seconds; 0 = never reload
+    
+    # Webhook Configuration (long polling is used when WEBHOOK_URL is empty)
+    WEBHOOK_URL: str = os.getenv('WEBHOOK_URL', '')  # Public HTTPS base URL
+    WEBHOOK_PATH: str = os.getenv('WEBHOOK_PATH', '/webhook')
+    WEBHOOK_SECRET: str = os.getenv('WEBHOOK_SECRET', '')
+    WEBAPP_HOST: str = os.getenv('WEBAPP_HOST', '0.0.0.0')
+    WEBAPP_PORT: int = int(os.getenv('WEBAPP_PORT', '8080'))
     
     # Bot Configuration
     DAILY_QUESTION_LIMIT: int = int(os.getenv('DAILY_QUESTION_LIMIT', '5'))
@@ -2,16 +2,42 @@
 
 import aiosqlite
 import asyncio
+import json
 import logging
 import os
+import time
+import typing
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
-from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from dataclasses import dataclass, replace
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from config import config
 
 logger = logging.getLogger(__name__)
 
+_UTC = timezone.utc
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize to a JSON string, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def day_number(moment: datetime) -> int:
+    """Return a date as a YYYYMMDD integer, so days compare without parsing."""
+    return moment.year * 10000 + moment.month * 100 + moment.day
+
 
 @dataclass
 class UserState:
@@ -19,25 +45,66 @@ class UserState:
     user_id: int
     username: Optional[str]
     daily_questions_completed: int
-    last_daily_reset: datetime
+    last_daily_reset: int  # Unix epoch seconds, like the other timestamps
     current_quiz_session: Optional[str]  # JSON string for current quiz state
     total_questions_answered: int
     total_correct_answers: int
-    created_at: datetime
-    updated_at: datetime
+    created_at: int
+    updated_at: int
+    last_daily_reset_day: int  # last_daily_reset's UTC date as YYYYMMDD
+
+
+@dataclass
+class Question:
+    """A quiz question with up to four answer options."""
+    __slots__ = (
+        'topic', 'question', 'option_a', 'option_b', 'option_c', 'option_d',
+        'correct_answer', 'correct_norm', 'explanation'
+    )
+    topic: str
+    question: str
+    option_a: str
+    option_b: str
+    option_c: str
+    option_d: str
+    correct_answer: str
+    correct_norm: str  # correct_answer stripped and uppercased, as compared against user answers
+    explanation: str
+    
+    @property
+    def options(self) -> Tuple[str, str, str, str]:
+        """Option texts A-D; unused options are empty."""
+        return (self.option_a, self.option_b, self.option_c, self.option_d)
+    
+    def to_dict(self) -> Dict[str, str]:
+        """Return the question as stored in questions_data, without the derived correct_norm."""
+        return {
+            'topic': self.topic,
+            'question': self.question,
+            'option_a': self.option_a,
+            'option_b': self.option_b,
+            'option_c': self.option_c,
+            'option_d': self.option_d,
+            'correct_answer': self.correct_answer,
+            'explanation': self.explanation,
+        }
 
 
 @dataclass
 class QuizSession:
     """Represents an active quiz session."""
+    __slots__ = (
+        'session_id', 'user_id', 'session_type', 'topic', 'questions',
+        'current_question_index', 'correct_answers', 'answers_given', 'started_at', 'is_completed'
+    )
     session_id: str
     user_id: int
     session_type: str  # 'daily' or 'practice'
     topic: Optional[str]
-    questions: List[Dict[str, Any]]  # List of question data
+    questions: List[Question]
     current_question_index: int
     correct_answers: int
-    answers_given: List[str]  # List of user's answers
+    answers_given: bytearray  # Normalised answer letters as ASCII codes, 0 for unrecognised
     started_at: datetime
     is_completed: bool
 
@@ -45,9 +112,111 @@ class QuizSession:
 class DatabaseManager:
     """Manages SQLite database operations for the bot."""
     
+    # Per-connection settings; SQLite only persists journal_mode in the file
+    CONNECTION_PRAGMAS = (
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-64000",
+        "PRAGMA busy_timeout=5000",
+    )
+    
+    # Extra settings for the read-only pool connections
+    READER_PRAGMAS = CONNECTION_PRAGMAS + ("PRAGMA query_only=1",)
+    
+    # Full schema; every statement is safe to re-run
+    SCHEMA_SQL = """
+        -- Users table
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            daily_questions_completed INTEGER DEFAULT 0,
+            last_daily_reset INTEGER,
+            last_daily_reset_day INTEGER,
+            current_quiz_session TEXT,
+            total_questions_answered INTEGER DEFAULT 0,
+            total_correct_answers INTEGER DEFAULT 0,
+            created_at INTEGER,
+            updated_at INTEGER
+        );
+        
+        -- Quiz sessions table (for historical data)
+        CREATE TABLE IF NOT EXISTS quiz_sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            session_type TEXT,
+            topic TEXT,
+            questions_data TEXT,
+            correct_answers INTEGER,
+            total_questions INTEGER,
+            completed_at INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        );
+        
+        -- User answers table (for detailed tracking)
+        CREATE TABLE IF NOT EXISTS user_answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            session_id TEXT,
+            question_text TEXT,
+            user_answer TEXT,
+            correct_answer TEXT,
+            is_correct INTEGER NOT NULL,
+            answered_at INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (session_id) REFERENCES quiz_sessions (session_id)
+        );
+        
+        -- Indexes for per-user history lookups
+        CREATE INDEX IF NOT EXISTS idx_qs_user
+        ON quiz_sessions (user_id, completed_at DESC);
+        
+        CREATE INDEX IF NOT EXISTS idx_ua_user_session
+        ON user_answers (user_id, session_id);
+    """
+    
+    # Columns of each table, in the order tables are rebuilt by _migrate
+    TABLE_COLUMNS = (
+        ('users', (
+            'user_id', 'username', 'daily_questions_completed', 'last_daily_reset',
+            'last_daily_reset_day', 'current_quiz_session', 'total_questions_answered',
+            'total_correct_answers', 'created_at', 'updated_at'
+        )),
+        ('quiz_sessions', (
+            'session_id', 'user_id', 'session_type', 'topic', 'questions_data',
+            'correct_answers', 'total_questions', 'completed_at'
+        )),
+        ('user_answers', (
+            'id', 'user_id', 'session_id', 'question_text', 'user_answer',
+            'correct_answer', 'is_correct', 'answered_at'
+        )),
+    )
+    
+    # Timestamp columns that older versions stored as ISO-8601 text
+    TIMESTAMP_COLUMNS = frozenset({
+        'last_daily_reset', 'created_at', 'updated_at', 'completed_at', 'answered_at'
+    })
+    
+    # Statement finalize_quiz logs each answer row with
+    INSERT_ANSWER_SQL = """INSERT INTO user_answers 
+                           (user_id, session_id, question_text, user_answer, correct_answer, 
+                            is_correct, answered_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    
+    # Recently read user states are reused for this many seconds
+    CACHE_TTL = 5.0
+    USER_CACHE_MAX_SIZE = 1000
+    
     def __init__(self):
         self.db_path = config.DATABASE_PATH
         self._initialized = False
+        self._db: Optional[aiosqlite.Connection] = None  # The single writer
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_connections: List[aiosqlite.Connection] = []
+        # user_id -> (read_at, state); entries are dropped whenever the user's row is written
+        self._user_cache: typing.OrderedDict[int, Tuple[float, UserState]] = OrderedDict()
+        # Bumped on every invalidation so reads racing a write don't cache stale rows
+        self._cache_generation = 0
     
     async def initialize(self) -> bool:
         """Initialize the database and create tables."""
@@ -57,9 +226,16 @@ class DatabaseManager:
             if db_dir and not os.path.exists(db_dir):
                 os.makedirs(db_dir, exist_ok=True)
 
-            async with aiosqlite.connect(self.db_path) as db:
-                await self._create_tables(db)
-                await db.commit()
+            # One connection for the process lifetime keeps SQLite's page cache warm
+            self._db = await self._open_connection()
+            self._write_lock = asyncio.Lock()
+            # WAL lets readers run alongside the writer and needs far fewer fsyncs
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._create_tables(self._db)
+            await self._migrate(self._db)
+            await self._db.commit()
+            
+            await self._open_readers()
             
             self._initialized = True
             logger.info("Database initialized successfully")
@@ -67,84 +243,185 @@ class DatabaseManager:
             
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
+            # Don't leave half-opened connection threads keeping the process alive
+            await self.close()
             return False
     
+    async def _open_connection(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open a connection with the per-connection PRAGMAs applied."""
+        if read_only:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            db = await aiosqlite.connect(uri, uri=True)
+            pragmas = self.READER_PRAGMAS
+        else:
+            db = await aiosqlite.connect(self.db_path)
+            pragmas = self.CONNECTION_PRAGMAS
+        
+        db.row_factory = aiosqlite.Row
+        for pragma in pragmas:
+            await db.execute(pragma)
+        return db
+    
+    async def _open_readers(self):
+        """Open the read-only connection pool used by lookups.
+        
+        With WAL, SELECTs on these connections run in parallel with each
+        other and with writes, instead of queueing on the writer's thread.
+        """
+        pool_size = config.DATABASE_READ_POOL_SIZE
+        if pool_size <= 0 or self.db_path == ':memory:':
+            return
+        
+        self._readers = asyncio.Queue()
+        for _ in range(pool_size):
+            reader = await self._open_connection(read_only=True)
+            self._reader_connections.append(reader)
+            self._readers.put_nowait(reader)
+    
+    @asynccontextmanager
+    async def _acquire_reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Check a read-only connection out of the pool, falling back to the writer."""
+        if self._readers is None:
+            yield self._db
+            return
+        
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+    
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Hold the writer for one unit of work.
+        
+        Writes share one connection, so they take turns; otherwise one
+        coroutine's commit could land in the middle of another's
+        transaction. Anything left uncommitted by a failure is rolled back.
+        """
+        async with self._write_lock:
+            try:
+                yield self._db
+            except BaseException:
+                if self._db.in_transaction:
+                    await self._db.rollback()
+                raise
+    
     async def _create_tables(self, db: aiosqlite.Connection):
         """Create necessary database tables."""
-        # Users table
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                daily_questions_completed INTEGER DEFAULT 0,
-                last_daily_reset TEXT,
-                current_quiz_session TEXT,
-                total_questions_answered INTEGER DEFAULT 0,
-                total_correct_answers INTEGER DEFAULT 0,
-                created_at TEXT,
-                updated_at TEXT
-            )
-        """)
+        # One script, so the whole schema goes to aiosqlite's thread in a single call
+        await db.executescript(self.SCHEMA_SQL)
+    
+    async def _migrate(self, db: aiosqlite.Connection):
+        """Bring tables created by older versions up to the current schema."""
+        async with db.execute("PRAGMA table_info(users)") as cursor:
+            columns = {row['name'] for row in await cursor.fetchall()}
         
-        # Quiz sessions table (for historical data)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS quiz_sessions (
-                session_id TEXT PRIMARY KEY,
-                user_id INTEGER,
-                session_type TEXT,
-                topic TEXT,
-                questions_data TEXT,
-                correct_answers INTEGER,
-                total_questions INTEGER,
-                completed_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
+        if 'last_daily_reset_day' not in columns:
+            logger.info("Adding users.last_daily_reset_day column")
+            await db.execute("ALTER TABLE users ADD COLUMN last_daily_reset_day INTEGER")
+            await db.execute(
+                """UPDATE users 
+                   SET last_daily_reset_day = CAST(strftime('%Y%m%d', last_daily_reset) AS INTEGER)
+                   WHERE last_daily_reset IS NOT NULL"""
             )
-        """)
         
-        # User answers table (for detailed tracking)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS user_answers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                session_id TEXT,
-                question_text TEXT,
-                user_answer TEXT,
-                correct_answer TEXT,
-                is_correct BOOLEAN,
-                answered_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                FOREIGN KEY (session_id) REFERENCES quiz_sessions (session_id)
+        async with db.execute("PRAGMA user_version") as cursor:
+            version = (await cursor.fetchone())[0]
+        
+        if version < 1:
+            logger.info("Converting timestamps to unix epoch seconds")
+            await db.executescript(self._rebuild_tables_script())
+    
+    def _rebuild_tables_script(self) -> str:
+        """SQL that recreates every table from SCHEMA_SQL and copies the rows over.
+        
+        Older tables declare their timestamps as TEXT, and SQLite can't change a
+        column's type in place; converted values would be stored back as text.
+        ISO-8601 timestamps are converted to epoch seconds on the way.
+        """
+        statements = [
+            "BEGIN",
+            # Indexes follow their table on rename; drop them so SCHEMA_SQL recreates them
+            "DROP INDEX IF EXISTS idx_qs_user",
+            "DROP INDEX IF EXISTS idx_ua_user_session",
+        ]
+        statements += [
+            f"ALTER TABLE {table} RENAME TO {table}_old" for table, _ in self.TABLE_COLUMNS
+        ]
+        statements.append(self.SCHEMA_SQL.strip().rstrip(';'))
+        
+        for table, columns in self.TABLE_COLUMNS:
+            values = []
+            for column in columns:
+                if column in self.TIMESTAMP_COLUMNS:
+                    values.append(
+                        f"CASE WHEN typeof({column}) = 'text' AND {column} LIKE '%-%' "
+                        f"THEN CAST(strftime('%s', {column}) AS INTEGER) ELSE {column} END"
+                    )
+                elif column == 'is_correct':
+                    values.append("COALESCE(is_correct, 0)")
+                else:
+                    values.append(column)
+            statements.append(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(values)} FROM {table}_old"
             )
-        """)
+        
+        statements += [
+            f"DROP TABLE {table}_old" for table, _ in reversed(self.TABLE_COLUMNS)
+        ]
+        statements += ["PRAGMA user_version = 1", "COMMIT"]
+        return ";\n".join(statements) + ";"
+    
+    def _invalidate_user(self, user_id: int):
+        """Forget the cached state of a user whose row was just written."""
+        self._user_cache.pop(user_id, None)
+        self._cache_generation += 1
     
     async def get_user_state(self, user_id: int) -> Optional[UserState]:
-        """Get user state from database."""
+        """Get user state from database, reusing a read from the last CACHE_TTL seconds."""
         if not self._initialized:
             return None
         
+        now = time.monotonic()
+        cached = self._user_cache.get(user_id)
+        if cached and now - cached[0] < self.CACHE_TTL:
+            self._user_cache.move_to_end(user_id)
+            return cached[1]
+        
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
+            generation = self._cache_generation
+            async with self._acquire_reader() as db:
+                async with db.execute(
                     "SELECT * FROM users WHERE user_id = ?", (user_id,)
-                )
-                row = await cursor.fetchone()
-                
-                if not row:
-                    return None
-                
-                return UserState(
-                    user_id=row['user_id'],
-                    username=row['username'],
-                    daily_questions_completed=row['daily_questions_completed'],
-                    last_daily_reset=datetime.fromisoformat(row['last_daily_reset']) if row['last_daily_reset'] else datetime.now(timezone.utc),
-                    current_quiz_session=row['current_quiz_session'],
-                    total_questions_answered=row['total_questions_answered'],
-                    total_correct_answers=row['total_correct_answers'],
-                    created_at=datetime.fromisoformat(row['created_at']),
-                    updated_at=datetime.fromisoformat(row['updated_at'])
-                )
-                
+                ) as cursor:
+                    row = await cursor.fetchone()
+            
+            if not row:
+                return None
+            
+            user_state = UserState(
+                user_id=row['user_id'],
+                username=row['username'],
+                daily_questions_completed=row['daily_questions_completed'],
+                # int() also covers tables whose columns were declared TEXT
+                last_daily_reset=int(row['last_daily_reset']) if row['last_daily_reset'] else int(time.time()),
+                current_quiz_session=row['current_quiz_session'],
+                total_questions_answered=row['total_questions_answered'],
+                total_correct_answers=row['total_correct_answers'],
+                created_at=int(row['created_at']),
+                updated_at=int(row['updated_at']),
+                last_daily_reset_day=row['last_daily_reset_day'] or 0
+            )
+            
+            if generation == self._cache_generation:
+                self._user_cache[user_id] = (now, user_state)
+                self._user_cache.move_to_end(user_id)
+                if len(self._user_cache) > self.USER_CACHE_MAX_SIZE:
+                    self._user_cache.popitem(last=False)
+            return user_state
+            
         except Exception as e:
             logger.error(f"Failed to get user state for {user_id}: {e}")
             return None
@@ -155,91 +432,64 @@ class DatabaseManager:
             return False
         
         try:
-            now = datetime.now(timezone.utc).isoformat()
+            moment = datetime.now(_UTC)
+            now = int(moment.timestamp())
             
-            async with aiosqlite.connect(self.db_path) as db:
-                # Check if user exists
-                cursor = await db.execute(
-                    "SELECT user_id FROM users WHERE user_id = ?", (user_id,)
+            async with self._write() as db:
+                # Insert new users, or just refresh the username of existing ones
+                await db.execute(
+                    """INSERT INTO users 
+                       (user_id, username, daily_questions_completed, last_daily_reset, 
+                        last_daily_reset_day, total_questions_answered, total_correct_answers,
+                        created_at, updated_at)
+                       VALUES (?, ?, 0, ?, ?, 0, 0, ?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET
+                           username = excluded.username,
+                           updated_at = excluded.updated_at""",
+                    (user_id, username, now, day_number(moment), now, now)
                 )
-                exists = await cursor.fetchone()
-                
-                if exists:
-                    # Update existing user
-                    await db.execute(
-                        "UPDATE users SET username = ?, updated_at = ? WHERE user_id = ?",
-                        (username, now, user_id)
-                    )
-                else:
-                    # Create new user
-                    await db.execute(
-                        """INSERT OR IGNORE INTO users 
-                           (user_id, username, daily_questions_completed, last_daily_reset, 
-                            total_questions_answered, total_correct_answers, created_at, updated_at)
-                           VALUES (?, ?, 0, ?, 0, 0, ?, ?)""",
-                        (user_id, username, now, now, now)
-                    )
-                
                 await db.commit()
+                self._invalidate_user(user_id)
                 return True
-                
+            
         except Exception as e:
             logger.error(f"Failed to create/update user {user_id}: {e}")
             return False
     
-    async def update_daily_progress(self, user_id: int, questions_completed: int) -> bool:
-        """Update user's daily progress."""
-        if not self._initialized:
-            return False
+    async def finalize_quiz(self, session: QuizSession) -> bool:
+        """Record a completed quiz in a single transaction.
         
-        try:
-            now = datetime.now(timezone.utc).isoformat()
-            
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(
-                    """UPDATE users 
-                       SET daily_questions_completed = ?, updated_at = ?
-                       WHERE user_id = ?""",
-                    (questions_completed, now, user_id)
-                )
-                await db.commit()
-                return True
-                
-        except Exception as e:
-            logger.error(f"Failed to update daily progress for {user_id}: {e}")
-            return False
-    
-    async def reset_daily_progress(self, user_id: int) -> bool:
-        """Reset user's daily progress (called at midnight UTC)."""
+        Saves the session and its answers, adds the results to the user's
+        totals and, for daily quizzes, to today's progress - one commit
+        instead of one per step.
+        """
         if not self._initialized:
             return False
         
         try:
-            now = datetime.now(timezone.utc).isoformat()
-            
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(
-                    """UPDATE users 
-                       SET daily_questions_completed = 0, last_daily_reset = ?, updated_at = ?
-                       WHERE user_id = ?""",
-                    (now, now, user_id)
+            now = int(time.time())
+            total_questions = len(session.questions)
+            daily_delta = total_questions if session.session_type == 'daily' else 0
+            # Encode before taking the writer, so other writes don't wait on it
+            questions_data = _json_dumps([question.to_dict() for question in session.questions])
+            answer_rows = [
+                (
+                    session.user_id,
+                    session.session_id,
+                    question.question,
+                    answer,
+                    question.correct_answer,
+                    int(answer == question.correct_norm),
+                    now
                 )
-                await db.commit()
-                return True
-                
-        except Exception as e:
-            logger.error(f"Failed to reset daily progress for {user_id}: {e}")
-            return False
-    
-    async def save_quiz_session(self, session: QuizSession) -> bool:
-        """Save a completed quiz session."""
-        if not self._initialized:
-            return False
-        
-        try:
-            import json
+                for question, answer in zip(
+                    session.questions,
+                    (chr(code) if code else '' for code in session.answers_given)
+                )
+            ]
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._write() as db:
+                await db.execute("BEGIN IMMEDIATE")
                 await db.execute(
                     """INSERT OR REPLACE INTO quiz_sessions 
                        (session_id, user_id, session_type, topic, questions_data, 
@@ -250,60 +500,117 @@ class DatabaseManager:
                         session.user_id,
                         session.session_type,
                         session.topic,
-                        json.dumps(session.questions),
+                        questions_data,
                         session.correct_answers,
-                        len(session.questions),
-                        datetime.now(timezone.utc).isoformat()
+                        total_questions,
+                        now
                     )
                 )
+                await db.executemany(self.INSERT_ANSWER_SQL, answer_rows)
+                await db.execute(
+                    """UPDATE users 
+                       SET total_questions_answered = total_questions_answered + ?,
+                           total_correct_answers = total_correct_answers + ?,
+                           daily_questions_completed = daily_questions_completed + ?,
+                           updated_at = ?
+                       WHERE user_id = ?""",
+                    (total_questions, session.correct_answers, daily_delta, now, session.user_id)
+                )
                 await db.commit()
+                self._invalidate_user(session.user_id)
                 return True
-                
+            
         except Exception as e:
-            logger.error(f"Failed to save quiz session {session.session_id}: {e}")
+            logger.error(f"Failed to finalize quiz session {session.session_id}: {e}")
             return False
     
-    async def update_user_stats(self, user_id: int, questions_answered: int, correct_answers: int) -> bool:
-        """Update user's overall statistics."""
+    async def bulk_reset_daily(self) -> int:
+        """Reset the daily progress of every user last reset before today.
+        
+        Returns the number of users reset, or -1 on failure.
+        """
         if not self._initialized:
-            return False
+            return -1
         
         try:
-            now = datetime.now(timezone.utc).isoformat()
+            moment = datetime.now(_UTC)
+            now = int(moment.timestamp())
+            today = day_number(moment)
             
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(
+            async with self._write() as db:
+                cursor = await db.execute(
                     """UPDATE users 
-                       SET total_questions_answered = total_questions_answered + ?,
-                           total_correct_answers = total_correct_answers + ?,
-                           updated_at = ?
-                       WHERE user_id = ?""",
-                    (questions_answered, correct_answers, now, user_id)
+                       SET daily_questions_completed = 0, last_daily_reset = ?,
+                           last_daily_reset_day = ?, updated_at = ?
+                       WHERE COALESCE(last_daily_reset_day, 0) < ?""",
+                    (now, today, now, today)
                 )
                 await db.commit()
-                return True
-                
+                reset_count = cursor.rowcount
+            
+            # Any cached state may predate the reset
+            self._user_cache.clear()
+            self._cache_generation += 1
+            return reset_count
+            
         except Exception as e:
-            logger.error(f"Failed to update user stats for {user_id}: {e}")
-            return False
+            logger.error(f"Failed to bulk reset daily progress: {e}")
+            return -1
     
-    async def needs_daily_reset(self, user_id: int) -> bool:
-        """Check if user needs daily reset based on last reset time."""
+    async def get_user_state_for_today(self, user_id: int) -> Optional[UserState]:
+        """Get user state, resetting the daily progress first if it is from an earlier day.
+        
+        Costs a single (usually cached) read when no reset is due, and one
+        extra UPDATE when it is.
+        """
         user_state = await self.get_user_state(user_id)
         if not user_state:
-            return True
+            return None
         
-        # Check if it's past midnight UTC since last reset
-        now = datetime.now(timezone.utc)
-        last_reset = user_state.last_daily_reset
+        moment = datetime.now(_UTC)
+        today = day_number(moment)
+        if user_state.last_daily_reset_day >= today:
+            return user_state
         
-        # If different day, need reset
-        return now.date() > last_reset.date()
+        try:
+            now = int(moment.timestamp())
+            
+            async with self._write() as db:
+                # Guarded on the day so a concurrent reset isn't applied twice;
+                # a NULL day reads back as 0, so it has to match here too
+                await db.execute(
+                    """UPDATE users 
+                       SET daily_questions_completed = 0, last_daily_reset = ?,
+                           last_daily_reset_day = ?, updated_at = ?
+                       WHERE user_id = ? AND COALESCE(last_daily_reset_day, 0) < ?""",
+                    (now, today, now, user_id, today)
+                )
+                await db.commit()
+                self._invalidate_user(user_id)
+            
+        except Exception as e:
+            logger.error(f"Failed to reset daily progress for {user_id}: {e}")
+            return user_state
+        
+        return replace(
+            user_state,
+            daily_questions_completed=0,
+            last_daily_reset=now,
+            last_daily_reset_day=today,
+            updated_at=now
+        )
     
     async def close(self):
         """Close database connections."""
-        # aiosqlite connections are closed automatically
-        pass
+        for reader in self._reader_connections:
+            await reader.close()
+        self._reader_connections = []
+        self._readers = None
+        
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+        self._initialized = False
 
 
 # Global instance
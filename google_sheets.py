@@ -2,11 +2,13 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import os
 import csv
-import pandas as pd
+import operator
+import pickle
+import sys
+import time
 
 try:
     from google.oauth2.service_account import Credentials
@@ -17,6 +19,7 @@ except ImportError:
     GOOGLE_AVAILABLE = False
 
 from config import config
+from database import Question
 
 logger = logging.getLogger(__name__)
 
@@ -27,13 +30,22 @@ if not GOOGLE_AVAILABLE:
 class GoogleSheetsClient:
     """Client for interacting with Google Sheets API with CSV fallback."""
     
+    # Bump when the shape of parsed questions changes, to ignore old disk caches
+    QUESTIONS_CACHE_VERSION = 3
+    
     def __init__(self):
         self.service = None
-        self.executor = ThreadPoolExecutor(max_workers=4)
         self._questions_cache = None
         self._topics_cache = None
+        self._cache_loaded_at = 0.0  # time.monotonic() of the last load attempt
+        self._by_topic: Dict[str, List[Question]] = {}  # lowercased topic -> questions
+        # lowercased topic -> questions of every other topic, built on first use
+        self._complement: Dict[str, List[Question]] = {}
+        self._fetch_lock: Optional[asyncio.Lock] = None
         self.use_fallback = False
         self.questions_directory = config.QUESTIONS_DIRECTORY
+        # Parsed topic CSVs, stored next to the questions directory
+        self.questions_cache_file = os.path.normpath(self.questions_directory) + '.pkl.cache'
     
     async def initialize(self) -> bool:
         """Initialize the Google Sheets service with CSV fallback."""
@@ -77,7 +89,7 @@ class GoogleSheetsClient:
                 # Load credentials and build service
                 loop = asyncio.get_event_loop()
                 self.service = await loop.run_in_executor(
-                    self.executor, self._build_service
+                    None, self._build_service
                 )
                 
                 # Test the connection by fetching a small range
@@ -113,60 +125,103 @@ class GoogleSheetsClient:
         """Test the connection to Google Sheets."""
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(
-            self.executor,
+            None,
             lambda: self.service.spreadsheets().get(
                 spreadsheetId=config.GOOGLE_SHEETS_ID
             ).execute()
         )
     
-    async def fetch_questions(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+    async def fetch_questions(self, force_refresh: bool = False) -> List[Question]:
         """
         Fetch all questions from Google Sheet or CSV fallback.
         
         Args:
             force_refresh: If True, ignore cache and fetch fresh data
             
+        Questions are cached for QUESTIONS_CACHE_TTL seconds, and concurrent
+        callers share a single reload.
+            
         Returns:
-            List of question dictionaries with keys:
-            - topic, question, option_a, option_b, option_c, option_d, 
-              correct_answer, explanation
+            List of Question records
         """
-        if self._questions_cache and not force_refresh:
+        if self._cache_is_fresh() and not force_refresh:
             return self._questions_cache
         
+        # Single-flight: concurrent callers on a cold cache share one load
+        if self._fetch_lock is None:
+            self._fetch_lock = asyncio.Lock()
+        
+        async with self._fetch_lock:
+            # Another caller may have filled the cache while we were waiting
+            if self._cache_is_fresh() and not force_refresh:
+                return self._questions_cache
+            
+            return await self._load_questions()
+    
+    def _cache_is_fresh(self) -> bool:
+        """Check whether cached questions exist and are younger than the TTL."""
+        if not self._questions_cache:
+            return False
+        ttl = config.QUESTIONS_CACHE_TTL
+        return ttl <= 0 or time.monotonic() - self._cache_loaded_at < ttl
+    
+    async def _load_questions(self) -> List[Question]:
+        """Load questions from the configured source and refresh the caches.
+        
+        If a reload fails, the previous questions keep being served until
+        the next attempt after another TTL.
+        """
         try:
             if self.use_fallback:
                 # Use CSV fallback
-                loop = asyncio.get_event_loop()
-                questions = await loop.run_in_executor(
-                    self.executor, self._fetch_questions_from_csv
-                )
+                questions = await self._fetch_questions_from_csv()
                 logger.info(f"Loaded {len(questions)} questions from CSV fallback")
             else:
                 # Try Google Sheets first
                 try:
                     loop = asyncio.get_event_loop()
                     result = await loop.run_in_executor(
-                        self.executor, self._fetch_questions_sync
+                        None, self._fetch_questions_sync
                     )
                     questions = self._parse_questions(result)
                     logger.info(f"Fetched {len(questions)} questions from Google Sheets")
                 except Exception as e:
                     logger.warning(f"Google Sheets failed: {e}, falling back to CSV")
                     self.use_fallback = True
-                    questions = await loop.run_in_executor(
-                        self.executor, self._fetch_questions_from_csv
-                    )
+                    questions = await self._fetch_questions_from_csv()
                     logger.info(f"Loaded {len(questions)} questions from CSV fallback")
             
+            self._cache_loaded_at = time.monotonic()
+            if not questions and self._questions_cache:
+                logger.warning("Reload returned no questions, keeping the cached ones")
+                return self._questions_cache
+            
             self._questions_cache = questions
-            self._topics_cache = None  # Clear topics cache to refresh
+            self._by_topic = self._index_by_topic(questions)
+            self._complement = {}
+            # One name per indexed topic, as first spelled in the data
+            self._topics_cache = sorted(group[0].topic for group in self._by_topic.values())
             return questions
             
         except Exception as e:
             logger.error(f"Failed to fetch questions from both sources: {e}")
+            if self._questions_cache:
+                self._cache_loaded_at = time.monotonic()
+                return self._questions_cache
             return []
     
+    def _index_by_topic(self, questions: List[Question]) -> Dict[str, List[Question]]:
+        """Group questions by lowercased topic so lookups don't scan every question."""
+        by_topic: Dict[str, List[Question]] = {}
+        lowered: Dict[str, str] = {}  # Lowercase each distinct topic name only once
+        for question in questions:
+            topic = question.topic
+            key = lowered.get(topic)
+            if key is None:
+                key = lowered[topic] = topic.lower()
+            by_topic.setdefault(key, []).append(question)
+        return by_topic
+    
     def _fetch_questions_sync(self):
         """Synchronous method to fetch data from Google Sheets."""
         # Assuming the sheet has headers in row 1 and data starts from row 2
@@ -179,8 +234,8 @@ class GoogleSheetsClient:
         
         return result.get('values', [])
     
-    def _parse_questions(self, raw_data: List[List[str]]) -> List[Dict[str, Any]]:
-        """Parse raw Google Sheets data into question dictionaries."""
+    def _parse_questions(self, raw_data: List[List[str]]) -> List[Question]:
+        """Parse raw Google Sheets data into Question records."""
         if not raw_data:
             return []
         
@@ -208,17 +263,23 @@ class GoogleSheetsClient:
                 logger.warning(f"Skipping row {i}: missing required fields")
                 continue
             
-            questions.append(question_dict)
+            # Share one string per topic instead of one per row
+            question_dict['topic'] = sys.intern(question_dict['topic'])
+            
+            questions.append(Question(
+                correct_norm=question_dict['correct_answer'].upper(),
+                **question_dict
+            ))
         
         return questions
     
-    def _fetch_questions_from_csv(self) -> List[Dict[str, Any]]:
+    async def _fetch_questions_from_csv(self) -> List[Question]:
         """Load questions from topic-specific CSV files."""
         questions = []
         
         # Load from topic-specific CSV files
         if os.path.exists(self.questions_directory):
-            questions = self._load_from_topic_csvs()
+            questions = await self._load_from_topic_csvs()
             if questions:
                 logger.info(f"Loaded {len(questions)} questions from topic CSV files")
                 return questions
@@ -226,140 +287,203 @@ class GoogleSheetsClient:
         logger.error(f"No CSV files found in {self.questions_directory}")
         return []
     
-    def _load_from_topic_csvs(self) -> List[Dict[str, Any]]:
+    async def _load_from_topic_csvs(self) -> List[Question]:
         """Load questions from topic-specific CSV files in the questions directory."""
         all_questions = []
         
         try:
-            # Get all CSV files in the questions directory
-            csv_files = [f for f in os.listdir(self.questions_directory) if f.endswith('.csv')]
+            loop = asyncio.get_event_loop()
+            csv_files, signature, cached = await loop.run_in_executor(
+                None, self._scan_topic_csvs
+            )
             
             if not csv_files:
                 logger.warning(f"No CSV files found in {self.questions_directory}")
                 return []
             
-            for csv_file in csv_files:
-                topic_name = os.path.splitext(csv_file)[0].title()  # filename becomes topic
-                file_path = os.path.join(self.questions_directory, csv_file)
-                
-                try:
-                    questions = self._load_topic_csv_file(file_path, topic_name)
-                    all_questions.extend(questions)
-                    logger.debug(f"Loaded {len(questions)} questions from {csv_file}")
-                except Exception as e:
-                    logger.warning(f"Failed to load {csv_file}: {e}")
+            # Reuse the parsed questions from the last run if no file has changed
+            if cached is not None:
+                return cached
+            
+            # Parse the files in parallel on the default executor's workers
+            topic_names = [
+                # Filename becomes topic; interned so every question shares one string
+                sys.intern(os.path.splitext(csv_file)[0].title())
+                for csv_file in csv_files
+            ]
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    None,
+                    self._load_topic_csv_file,
+                    os.path.join(self.questions_directory, csv_file),
+                    topic_name
+                )
+                for csv_file, topic_name in zip(csv_files, topic_names)
+            ], return_exceptions=True)
+            
+            for csv_file, questions in zip(csv_files, results):
+                if isinstance(questions, Exception):
+                    logger.warning(f"Failed to load {csv_file}: {questions}")
                     continue
+                all_questions.extend(questions)
+                logger.debug(f"Loaded {len(questions)} questions from {csv_file}")
             
+            await loop.run_in_executor(
+                None, self._write_questions_cache, signature, all_questions
+            )
             return all_questions
             
         except Exception as e:
             logger.error(f"Error loading from topic CSV files: {e}")
             return []
     
-    def _load_topic_csv_file(self, file_path: str, topic_name: str) -> List[Dict[str, Any]]:
+    def _scan_topic_csvs(self) -> Tuple[List[str], tuple, Optional[List[Question]]]:
+        """List the topic CSV files and look up their disk-cached questions (runs in thread)."""
+        # Get all CSV files in the questions directory
+        csv_files = sorted(f for f in os.listdir(self.questions_directory) if f.endswith('.csv'))
+        if not csv_files:
+            return [], (), None
+        
+        signature = self._csv_signature(csv_files)
+        return csv_files, signature, self._read_questions_cache(signature)
+    
+    def _csv_signature(self, csv_files: List[str]) -> tuple:
+        """Identify the current contents of the CSV files by name, mtime and size."""
+        entries = []
+        for csv_file in csv_files:
+            stat = os.stat(os.path.join(self.questions_directory, csv_file))
+            entries.append((csv_file, stat.st_mtime_ns, stat.st_size))
+        return (self.QUESTIONS_CACHE_VERSION, tuple(entries))
+    
+    def _read_questions_cache(self, signature: tuple) -> Optional[List[Question]]:
+        """Return the questions from the disk cache if it was built from the same files."""
+        try:
+            with open(self.questions_cache_file, 'rb') as file:
+                cached_signature, questions = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable questions cache {self.questions_cache_file}: {e}")
+            return None
+        
+        if cached_signature != signature:
+            return None
+        
+        logger.debug(f"Loaded {len(questions)} questions from {self.questions_cache_file}")
+        return questions
+    
+    def _write_questions_cache(self, signature: tuple, questions: List[Question]):
+        """Store parsed questions on disk; failing to do so only costs a re-parse next time."""
+        temp_file = f"{self.questions_cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, 'wb') as file:
+                pickle.dump((signature, questions), file, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomic swap so a concurrent reader never sees a partial file
+            os.replace(temp_file, self.questions_cache_file)
+        except Exception as e:
+            logger.warning(f"Could not write questions cache {self.questions_cache_file}: {e}")
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+    
+    def _load_topic_csv_file(self, file_path: str, topic_name: str) -> List[Question]:
         """Load questions from a single topic CSV file."""
         questions = []
         
+        # Expected columns for topic files (no Topic column needed)
+        expected_columns = ['question', 'option_a', 'option_b', 'option_c', 
+                          'option_d', 'correct_answer', 'explanation']
+        
         try:
-            # Try pandas first
-            df = pd.read_csv(file_path)
-            
-            # Expected columns for topic files (no Topic column needed)
-            expected_columns = ['question', 'option_a', 'option_b', 'option_c', 
-                              'option_d', 'correct_answer', 'explanation']
-            
-            # Convert column names to lowercase with underscores
-            df.columns = df.columns.str.lower().str.replace(' ', '_')
-            
-            # Check required columns
-            missing_columns = [col for col in expected_columns if col not in df.columns]
-            if missing_columns:
-                logger.warning(f"Missing columns in {file_path}: {missing_columns}")
-                return []
-            
-            # Convert to question dictionaries
-            for index, row in df.iterrows():
-                question_dict = {
-                    'topic': topic_name,  # Use filename as topic
-                    'question': str(row['question']).strip() if pd.notna(row['question']) else '',
-                    'option_a': str(row['option_a']).strip() if pd.notna(row['option_a']) else '',
-                    'option_b': str(row['option_b']).strip() if pd.notna(row['option_b']) else '',
-                    'option_c': str(row['option_c']).strip() if pd.notna(row['option_c']) else '',
-                    'option_d': str(row['option_d']).strip() if pd.notna(row['option_d']) else '',
-                    'correct_answer': str(row['correct_answer']).strip() if pd.notna(row['correct_answer']) else '',
-                    'explanation': str(row['explanation']).strip() if pd.notna(row['explanation']) else ''
-                }
+            with open(file_path, 'r', encoding='utf-8-sig', newline='') as file:
+                reader = csv.reader(file)
+                header = next(reader, None)
+                if header is None:
+                    logger.warning(f"Empty CSV file: {file_path}")
+                    return []
                 
-                # Validate required fields
-                if not all([question_dict['question'], question_dict['correct_answer']]):
-                    logger.warning(f"Skipping row {index + 2} in {file_path}: missing required fields")
-                    continue
+                # Map column names (lowercase with underscores) to their positions once
+                positions = {name.strip().lower().replace(' ', '_'): i for i, name in enumerate(header)}
+                
+                # Check required columns
+                missing_columns = [col for col in expected_columns if col not in positions]
+                if missing_columns:
+                    logger.warning(f"Missing columns in {file_path}: {missing_columns}")
+                    return []
                 
-                questions.append(question_dict)
+                indexes = [positions[col] for col in expected_columns]
+                width = max(indexes) + 1
+                # Pulls all expected cells out of a row in one C-level call
+                pick_columns = operator.itemgetter(*indexes)
+                
+                for row_num, row in enumerate(reader, start=2):
+                    if not row:
+                        continue  # Blank line
+                    
+                    # Pad short rows so every expected column exists
+                    if len(row) < width:
+                        row += [''] * (width - len(row))
+                    
+                    question, option_a, option_b, option_c, option_d, correct_answer, explanation = map(
+                        str.strip, pick_columns(row)
+                    )
+                    
+                    # Validate required fields
+                    if not question or not correct_answer:
+                        logger.warning(f"Skipping row {row_num} in {file_path}: missing required fields")
+                        continue
+                    
+                    questions.append(Question(
+                        topic=topic_name,  # Use filename as topic
+                        question=question,
+                        option_a=option_a,
+                        option_b=option_b,
+                        option_c=option_c,
+                        option_d=option_d,
+                        correct_answer=correct_answer,
+                        correct_norm=correct_answer.upper(),
+                        explanation=explanation
+                    ))
             
             return questions
             
         except Exception as e:
-            logger.warning(f"Failed to read {file_path} with pandas: {e}, trying basic CSV reader")
-            
-            # Fallback to basic CSV reader
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    reader = csv.DictReader(file)
-                    
-                    for row_num, row in enumerate(reader, start=2):
-                        # Normalize keys
-                        normalized_row = {}
-                        for key, value in row.items():
-                            normalized_key = key.lower().replace(' ', '_')
-                            normalized_row[normalized_key] = value.strip() if value else ''
-                        
-                        question_dict = {
-                            'topic': topic_name,
-                            'question': normalized_row.get('question', ''),
-                            'option_a': normalized_row.get('option_a', ''),
-                            'option_b': normalized_row.get('option_b', ''),
-                            'option_c': normalized_row.get('option_c', ''),
-                            'option_d': normalized_row.get('option_d', ''),
-                            'correct_answer': normalized_row.get('correct_answer', ''),
-                            'explanation': normalized_row.get('explanation', '')
-                        }
-                        
-                        # Validate required fields
-                        if not all([question_dict['question'], question_dict['correct_answer']]):
-                            logger.warning(f"Skipping row {row_num} in {file_path}: missing required fields")
-                            continue
-                        
-                        questions.append(question_dict)
-                
-                return questions
-                
-            except Exception as csv_error:
-                logger.error(f"Failed to read {file_path}: {csv_error}")
-                return []
+            logger.error(f"Failed to read {file_path}: {e}")
+            return []
     
     
     async def get_topics(self) -> List[str]:
         """Get all unique topics from the questions."""
-        if self._topics_cache:
-            return self._topics_cache
-        
-        questions = await self.fetch_questions()
-        topics = list(set(q['topic'] for q in questions if q['topic']))
-        topics.sort()
-        
-        self._topics_cache = topics
-        return topics
+        # Built alongside the question cache; a no-op while that is fresh
+        await self.fetch_questions()
+        return self._topics_cache or []
     
-    async def get_questions_by_topic(self, topic: str) -> List[Dict[str, Any]]:
+    async def get_questions_by_topic(self, topic: str) -> List[Question]:
         """Get all questions for a specific topic."""
-        questions = await self.fetch_questions()
-        return [q for q in questions if q['topic'].lower() == topic.lower()]
+        await self.fetch_questions()
+        # Copy, since callers extend and shuffle the list they get
+        return list(self._by_topic.get(topic.lower(), ()))
     
-    def close(self):
-        """Clean up resources."""
-        if self.executor:
-            self.executor.shutdown(wait=True)
+    async def get_questions_excluding_topic(self, topic: str) -> List[Question]:
+        """Get all questions outside a topic.
+        
+        The list is shared between callers until the next reload, so it
+        must not be modified.
+        """
+        await self.fetch_questions()
+        key = topic.lower()
+        if key not in self._by_topic:
+            # Callback data can name any topic; don't cache a bank copy per unknown one
+            return self._questions_cache or []
+        complement = self._complement.get(key)
+        if complement is None:
+            complement = self._complement[key] = [
+                question
+                for other, questions in self._by_topic.items() if other != key
+                for question in questions
+            ]
+        return complement
 
 
 # Global instance
@@ -1,12 +1,12 @@
 """Quiz logic and session management."""
 
 import json
+import os
 import random
-import uuid
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, Tuple
 
-from database import QuizSession, db_manager
+from database import Question, QuizSession, db_manager
 from google_sheets import sheets_client
 from config import config
 
@@ -14,6 +14,34 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Display prefixes for options A-D, in the same order as Question.options
+_OPTION_PREFIXES = ('A. ', 'B. ', 'C. ', 'D. ')
+
+# Message templates for format_question and format_feedback
+_QUESTION_TEMPLATE = "❓ **Question %d/%d**\n\n📚 **Topic:** %s\n\n%s\n\n"
+_CORRECT_HEADER = "✅ **Correct!**\n\n"
+_INCORRECT_TEMPLATE = "❌ **Incorrect**\n\nThe correct answer is: **%s**\n\n"
+_EXPLANATION_TEMPLATE = "💡 **Explanation:** %s\n\n"
+_COMPLETED_TEMPLATE = "🎉 **Quiz Completed!**\n📊 **Final Score:** %d/%d\n🎯 **Accuracy:** %.1f%%\n\n"
+_DAILY_COMPLETED_FOOTER = (
+    "🌟 Daily quiz completed! Come back tomorrow for more practice.\n"
+    "💪 Want to practice more? Use /practice for additional questions!"
+)
+_PRACTICE_COMPLETED_FOOTER = "💪 Great practice session! Use /practice to start another round!"
+
+
+def _partial_shuffle(pool: List[Any], k: int) -> List[Any]:
+    """Return k random items of pool in random order, shuffling only the first k slots.
+    
+    Reorders pool in place, so only pass lists the caller owns.
+    """
+    n = len(pool)
+    k = min(k, n)
+    for i in range(k):
+        j = random.randrange(i, n)
+        pool[i], pool[j] = pool[j], pool[i]
+    return pool[:k]
+
 
 class QuizManager:
     """Manages quiz sessions and logic."""
@@ -23,11 +51,8 @@ class QuizManager:
     
     async def can_start_daily_quiz(self, user_id: int) -> bool:
         """Check if user can start their daily quiz."""
-        # Check if daily reset is needed
-        if await db_manager.needs_daily_reset(user_id):
-            await db_manager.reset_daily_progress(user_id)
-        
-        user_state = await db_manager.get_user_state(user_id)
+        # Resets the daily progress first if it is from an earlier day
+        user_state = await db_manager.get_user_state_for_today(user_id)
         if not user_state:
             return True  # New user can start
         
@@ -44,14 +69,14 @@ class QuizManager:
             return None
         
         session = QuizSession(
-            session_id=str(uuid.uuid4()),
+            session_id=os.urandom(16).hex(),
             user_id=user_id,
             session_type='daily',
             topic=None,
             questions=questions,
             current_question_index=0,
             correct_answers=0,
-            answers_given=[],
+            answers_given=bytearray(),
             started_at=datetime.now(timezone.utc),
             is_completed=False
         )
@@ -62,32 +87,33 @@ class QuizManager:
     async def start_practice_quiz(self, user_id: int, topic: Optional[str] = None) -> Optional[QuizSession]:
         """Start a practice quiz session for the user."""
         if topic:
+            # A fresh copy of the topic's questions, so it can be shuffled in place
             questions = await sheets_client.get_questions_by_topic(topic)
             if len(questions) < config.DAILY_QUESTION_LIMIT:
                 # If not enough questions in topic, supplement with random questions
                 additional_needed = config.DAILY_QUESTION_LIMIT - len(questions)
-                random_questions = await self._get_random_questions(additional_needed, exclude_topics=[topic])
+                random_questions = await self._get_random_questions(additional_needed, exclude_topic=topic)
                 questions.extend(random_questions)
+            
+            # Pick the exact number needed in random order in one pass
+            questions = _partial_shuffle(questions, config.DAILY_QUESTION_LIMIT)
         else:
+            # Already a random sample in random order
             questions = await self._get_random_questions(config.DAILY_QUESTION_LIMIT)
         
         if not questions:
             logger.error("No questions available for practice quiz")
             return None
         
-        # Shuffle and limit to exact number needed
-        random.shuffle(questions)
-        questions = questions[:config.DAILY_QUESTION_LIMIT]
-        
         session = QuizSession(
-            session_id=str(uuid.uuid4()),
+            session_id=os.urandom(16).hex(),
             user_id=user_id,
             session_type='practice',
             topic=topic,
             questions=questions,
             current_question_index=0,
             correct_answers=0,
-            answers_given=[],
+            answers_given=bytearray(),
             started_at=datetime.now(timezone.utc),
             is_completed=False
         )
@@ -95,16 +121,17 @@ class QuizManager:
         self.active_sessions[user_id] = session
         return session
     
-    async def _get_random_questions(self, count: int, exclude_topics: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-        """Get random questions from the sheets."""
-        all_questions = await sheets_client.fetch_questions()
-        
-        if exclude_topics:
-            all_questions = [q for q in all_questions if q['topic'] not in exclude_topics]
+    async def _get_random_questions(self, count: int, exclude_topic: Optional[str] = None) -> List[Question]:
+        """Get random questions from the sheets, optionally leaving out one topic."""
+        if exclude_topic:
+            all_questions = await sheets_client.get_questions_excluding_topic(exclude_topic)
+        else:
+            all_questions = await sheets_client.fetch_questions()
         
         if len(all_questions) < count:
             logger.warning(f"Only {len(all_questions)} questions available, requested {count}")
-            return all_questions
+            # Copy, since the cached lists are shared
+            return list(all_questions)
         
         return random.sample(all_questions, count)
     
@@ -112,16 +139,26 @@ class QuizManager:
         """Get the active session for a user."""
         return self.active_sessions.get(user_id)
     
-    def get_current_question(self, user_id: int) -> Optional[Dict[str, Any]]:
+    def get_current_question(self, user_id: int) -> Optional[Question]:
         """Get the current question for a user's active session."""
-        session = self.get_active_session(user_id)
+        return self.get_active_session_with_question(user_id)[1]
+    
+    def get_active_session_with_question(
+        self, user_id: int
+    ) -> Tuple[Optional[QuizSession], Optional[Question]]:
+        """Get a user's active session and its current question with a single lookup.
+        
+        The question is None when there is no session, or the session is
+        completed or has run out of questions.
+        """
+        session = self.active_sessions.get(user_id)
         if not session or session.is_completed:
-            return None
+            return session, None
         
         if session.current_question_index >= len(session.questions):
-            return None
+            return session, None
         
-        return session.questions[session.current_question_index]
+        return session, session.questions[session.current_question_index]
     
     async def submit_answer(self, user_id: int, answer: str) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -131,29 +168,32 @@ class QuizManager:
             Tuple of (is_correct, feedback_data)
             feedback_data contains: correct_answer, explanation, is_last_question
         """
-        session = self.get_active_session(user_id)
+        # One lookup; same guards as get_active_session_with_question
+        session = self.active_sessions.get(user_id)
         if not session or session.is_completed:
             return False, {}
         
-        current_question = self.get_current_question(user_id)
-        if not current_question:
+        question_index = session.current_question_index
+        if question_index >= len(session.questions):
             return False, {}
+        current_question = session.questions[question_index]
         
         # Check if answer is correct
-        correct_answer = current_question['correct_answer'].strip().upper()
-        user_answer = answer.strip().upper()
-        is_correct = user_answer == correct_answer
+        normalized = answer.strip().upper()
+        is_correct = normalized == current_question.correct_norm
         
-        # Update session
-        session.answers_given.append(answer)
+        # Update session; answers are single letters, anything else is stored as 0
+        session.answers_given.append(
+            ord(normalized) if len(normalized) == 1 and normalized < '\x80' else 0
+        )
         if is_correct:
             session.correct_answers += 1
         
         # Prepare feedback data
         feedback_data = {
             'is_correct': is_correct,
-            'correct_answer': current_question['correct_answer'],
-            'explanation': current_question.get('explanation', ''),
+            'correct_answer': current_question.correct_answer,
+            'explanation': current_question.explanation,
             'question_number': session.current_question_index + 1,
             'total_questions': len(session.questions)
         }
@@ -176,76 +216,54 @@ class QuizManager:
         """Complete a quiz session and update user stats."""
         session.is_completed = True
         
-        # Update database
-        await db_manager.save_quiz_session(session)
-        await db_manager.update_user_stats(
-            session.user_id, 
-            len(session.questions), 
-            session.correct_answers
-        )
-        
-        # Update daily progress if it's a daily quiz
-        if session.session_type == 'daily':
-            user_state = await db_manager.get_user_state(session.user_id)
-            if user_state:
-                new_daily_count = user_state.daily_questions_completed + len(session.questions)
-                await db_manager.update_daily_progress(session.user_id, new_daily_count)
+        # Save the session, answers, stats and daily progress in one transaction
+        await db_manager.finalize_quiz(session)
         
         # Remove from active sessions
-        if session.user_id in self.active_sessions:
-            del self.active_sessions[session.user_id]
+        self.active_sessions.pop(session.user_id, None)
     
-    def format_question(self, question_data: Dict[str, Any], question_number: int, total_questions: int) -> str:
+    def format_question(self, question_data: Question, question_number: int, total_questions: int) -> str:
         """Format a question for display."""
-        text = f"❓ **Question {question_number}/{total_questions}**\n\n"
-        text += f"📚 **Topic:** {question_data['topic']}\n\n"
-        text += f"{question_data['question']}\n\n"
+        parts = [_QUESTION_TEMPLATE % (
+            question_number, total_questions, question_data.topic, question_data.question
+        )]
         
-        options = ['A', 'B', 'C', 'D']
-        for i, option in enumerate(options):
-            option_text = question_data.get(f'option_{option.lower()}', '')
+        for prefix, option_text in zip(_OPTION_PREFIXES, question_data.options):
             if option_text:
-                text += f"{option}. {option_text}\n"
+                parts += (prefix, option_text, "\n")
         
-        return text
+        return "".join(parts)
     
     def format_feedback(self, feedback_data: Dict[str, Any]) -> str:
         """Format feedback message after an answer."""
         if feedback_data['is_correct']:
-            text = "✅ **Correct!**\n\n"
+            parts = [_CORRECT_HEADER]
         else:
-            text = "❌ **Incorrect**\n\n"
-            text += f"The correct answer is: **{feedback_data['correct_answer']}**\n\n"
+            parts = [_INCORRECT_TEMPLATE % feedback_data['correct_answer']]
         
         if feedback_data.get('explanation'):
-            text += f"💡 **Explanation:** {feedback_data['explanation']}\n\n"
+            parts.append(_EXPLANATION_TEMPLATE % feedback_data['explanation'])
         
         if feedback_data.get('is_quiz_completed'):
-            text += f"🎉 **Quiz Completed!**\n"
-            text += f"📊 **Final Score:** {feedback_data['final_score']}/{feedback_data['question_number']}\n"
-            
-            accuracy = (feedback_data['final_score'] / feedback_data['question_number']) * 100
-            text += f"🎯 **Accuracy:** {accuracy:.1f}%\n\n"
+            final_score = feedback_data['final_score']
+            question_number = feedback_data['question_number']
+            accuracy = (final_score / question_number) * 100
+            parts.append(_COMPLETED_TEMPLATE % (final_score, question_number, accuracy))
             
             if feedback_data['session_type'] == 'daily':
-                text += "🌟 Daily quiz completed! Come back tomorrow for more practice.\n"
-                text += "💪 Want to practice more? Use /practice for additional questions!"
+                parts.append(_DAILY_COMPLETED_FOOTER)
             else:
-                text += "💪 Great practice session! Use /practice to start another round!"
+                parts.append(_PRACTICE_COMPLETED_FOOTER)
         
-        return text
+        return "".join(parts)
     
     async def get_user_stats(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user statistics."""
-        user_state = await db_manager.get_user_state(user_id)
+        # Resets the daily progress first if it is from an earlier day
+        user_state = await db_manager.get_user_state_for_today(user_id)
         if not user_state:
             return None
         
-        # Check if daily reset is needed
-        if await db_manager.needs_daily_reset(user_id):
-            await db_manager.reset_daily_progress(user_id)
-            user_state = await db_manager.get_user_state(user_id)  # Refresh
-        
         accuracy = 0
         if user_state.total_questions_answered > 0:
             accuracy = (user_state.total_correct_answers / user_state.total_questions_answered) * 100
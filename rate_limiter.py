@@ -0,0 +1,116 @@
+"""Per-chat rate limiting for outbound Telegram messages."""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import (
+    EditMessageReplyMarkup, EditMessageText, SendMessage, SendPoll
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _ChatWindow:
+    """Send timestamps and the send lock for a single chat."""
+
+    __slots__ = ('lock', 'sent')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.sent: Deque[float] = deque()
+
+
+class ChatRateLimiter:
+    """Sliding-window limiter that keeps sends under Telegram's per-chat flood limits.
+
+    Sends to the same chat run one at a time and in call order. Once a chat
+    has used up its window, the next send waits until the oldest one expires
+    instead of failing with a 429 from Telegram.
+    """
+
+    # Drop idle chat windows once this many are tracked
+    PRUNE_THRESHOLD = 1000
+
+    def __init__(
+        self,
+        private_limit: Tuple[int, float] = (5, 5.0),
+        group_limit: Tuple[int, float] = (18, 60.0)
+    ):
+        """
+        Args:
+            private_limit: (max messages, period in seconds) for private chats
+            group_limit: (max messages, period in seconds) for groups and channels
+        """
+        self.private_limit = private_limit
+        self.group_limit = group_limit
+        self._windows: Dict[int, _ChatWindow] = {}
+
+    @asynccontextmanager
+    async def limit(self, chat_id: int) -> AsyncIterator[None]:
+        """Wait for a free slot in the chat's window, then hold it for one send."""
+        window = self._windows.get(chat_id)
+        if window is None:
+            if len(self._windows) >= self.PRUNE_THRESHOLD:
+                self._prune()
+            window = self._windows[chat_id] = _ChatWindow()
+
+        # Group and channel chat ids are negative
+        max_messages, period = self.group_limit if chat_id < 0 else self.private_limit
+        loop = asyncio.get_running_loop()
+
+        async with window.lock:
+            now = loop.time()
+            while window.sent and now - window.sent[0] >= period:
+                window.sent.popleft()
+
+            if len(window.sent) >= max_messages:
+                delay = period - (now - window.sent[0])
+                logger.debug(f"Throttling chat {chat_id} for {delay:.1f} seconds")
+                await asyncio.sleep(delay)
+                window.sent.popleft()
+
+            try:
+                yield
+            finally:
+                window.sent.append(loop.time())
+
+    def _prune(self):
+        """Forget chats that have no send in progress and nothing left in their window."""
+        now = asyncio.get_running_loop().time()
+        period = max(self.private_limit[1], self.group_limit[1])
+        idle = [
+            chat_id for chat_id, window in self._windows.items()
+            if not window.lock.locked() and (not window.sent or now - window.sent[-1] >= period)
+        ]
+        for chat_id in idle:
+            del self._windows[chat_id]
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """Bot API session middleware that runs every chat send and edit through a limiter.
+    
+    Covers direct bot calls as well as shortcuts like message.answer() and
+    message.reply(), since they all end up as requests on the bot session.
+    """
+
+    LIMITED_METHODS = (SendMessage, SendPoll, EditMessageText, EditMessageReplyMarkup)
+
+    def __init__(self, limiter: ChatRateLimiter):
+        self.limiter = limiter
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, 'chat_id', None)
+        # Inline message edits have no chat, and @username targets can't be keyed by sign
+        if not isinstance(method, self.LIMITED_METHODS) or not isinstance(chat_id, int):
+            return await make_request(bot, method)
+
+        async with self.limiter.limit(chat_id):
+            return await make_request(bot, method)
+
+
+# Global instance
+send_limiter = ChatRateLimiter()
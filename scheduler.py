@@ -2,7 +2,7 @@
 
 import asyncio
 import logging
-from datetime import datetime, timezone, time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from database import db_manager
@@ -16,6 +16,7 @@ class DailyScheduler:
     def __init__(self):
         self.is_running = False
         self.task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
     
     async def start(self):
         """Start the scheduler."""
@@ -23,73 +24,71 @@ class DailyScheduler:
             return
         
         self.is_running = True
+        self._stop_event = asyncio.Event()
         self.task = asyncio.create_task(self._run_scheduler())
         logger.info("Daily scheduler started")
     
     async def stop(self):
-        """Stop the scheduler."""
+        """Stop the scheduler, letting a reset in progress finish."""
         self.is_running = False
+        if self._stop_event:
+            self._stop_event.set()
         if self.task:
-            self.task.cancel()
-            try:
-                await self.task
-            except asyncio.CancelledError:
-                pass
+            await self.task
+            self.task = None
         logger.info("Daily scheduler stopped")
     
+    @staticmethod
+    def _seconds_until_midnight() -> float:
+        """Seconds from now until the next midnight UTC."""
+        now = datetime.now(timezone.utc)
+        next_midnight = (now + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        return (next_midnight - now).total_seconds()
+    
+    async def _sleep_until(self, deadline: float) -> bool:
+        """Sleep until the event loop clock reaches deadline; True if stopped first."""
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
     async def _run_scheduler(self):
-        """Main scheduler loop."""
+        """Main scheduler loop: sleep until the next midnight UTC, then reset."""
+        loop = asyncio.get_running_loop()
+        
+        # Catch up on a midnight that passed while the bot was down
+        await self._perform_daily_reset()
+        
         while self.is_running:
             try:
-                # Calculate seconds until next midnight UTC
-                now = datetime.now(timezone.utc)
-                next_midnight = datetime.combine(
-                    now.date().replace(day=now.day + 1),
-                    time.min,
-                    timezone.utc
-                )
+                seconds_until_midnight = self._seconds_until_midnight()
+                logger.debug(f"Scheduler sleeping for {seconds_until_midnight:.0f} seconds until midnight")
+                if await self._sleep_until(loop.time() + seconds_until_midnight):
+                    break
                 
-                # If it's already past midnight today, reset for today
-                midnight_today = datetime.combine(
-                    now.date(),
-                    time.min,
-                    timezone.utc
-                )
+                await self._perform_daily_reset()
                 
-                # Check if we need to do an immediate reset
-                if now.hour == 0 and now.minute < 5:  # Within 5 minutes of midnight
-                    await self._perform_daily_reset()
-                
-                seconds_until_midnight = (next_midnight - now).total_seconds()
-                
-                # Sleep until next midnight (or check every hour if more than 1 hour away)
-                sleep_time = min(seconds_until_midnight, 3600)  # Max 1 hour
-                
-                logger.debug(f"Scheduler sleeping for {sleep_time:.0f} seconds until next check")
-                await asyncio.sleep(sleep_time)
-                
-                # If we're at midnight, perform reset
-                current_time = datetime.now(timezone.utc)
-                if current_time.hour == 0 and current_time.minute < 5:
-                    await self._perform_daily_reset()
-                
-            except asyncio.CancelledError:
-                break
             except Exception as e:
                 logger.error(f"Error in scheduler: {e}")
                 # Sleep for a bit before retrying
-                await asyncio.sleep(300)  # 5 minutes
+                if await self._sleep_until(loop.time() + 300):  # 5 minutes
+                    break
     
     async def _perform_daily_reset(self):
         """Perform daily reset for all users."""
         try:
             logger.info("Performing daily reset for all users")
             
-            # In a real implementation, you'd want to get all users and reset them
-            # For now, we'll rely on the individual reset check in quiz_logic.py
-            # This could be enhanced to batch process all users
-            
-            logger.info("Daily reset completed")
+            reset_count = await db_manager.bulk_reset_daily()
+            if reset_count < 0:
+                # Users still get reset lazily on their next quiz or /stats
+                logger.warning("Daily reset failed, falling back to per-user resets")
+            else:
+                logger.info(f"Daily reset completed for {reset_count} users")
             
         except Exception as e:
             logger.error(f"Error during daily reset: {e}")
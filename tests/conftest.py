@@ -0,0 +1,6 @@
+"""Shared test setup."""
+
+import os
+
+# bot.py builds its Bot at import time, which rejects malformed tokens
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST-token')
@@ -0,0 +1,244 @@
+"""Tests for DatabaseManager schema migrations."""
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+from database import DatabaseManager, Question, QuizSession, day_number
+
+# Schema and values as written by versions that stored ISO-8601 timestamps
+OLD_SCHEMA = """
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        daily_questions_completed INTEGER DEFAULT 0,
+        last_daily_reset TEXT,
+        current_quiz_session TEXT,
+        total_questions_answered INTEGER DEFAULT 0,
+        total_correct_answers INTEGER DEFAULT 0,
+        created_at TEXT,
+        updated_at TEXT
+    );
+    CREATE TABLE quiz_sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        session_type TEXT,
+        topic TEXT,
+        questions_data TEXT,
+        correct_answers INTEGER,
+        total_questions INTEGER,
+        completed_at TEXT
+    );
+    CREATE TABLE user_answers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        session_id TEXT,
+        question_text TEXT,
+        user_answer TEXT,
+        correct_answer TEXT,
+        is_correct BOOLEAN,
+        answered_at TEXT
+    );
+"""
+
+RESET_AT = '2024-03-01T23:30:15.123456+00:00'
+CREATED_AT = '2024-02-10T08:00:00+00:00'
+UPDATED_AT = '2024-03-01T23:45:00.5+00:00'
+
+
+def epoch(iso: str) -> int:
+    return int(datetime.fromisoformat(iso).timestamp())
+
+
+def build_old_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.execute(
+        "INSERT INTO users VALUES (1, 'alice', 3, ?, NULL, 20, 15, ?, ?)",
+        (RESET_AT, CREATED_AT, UPDATED_AT)
+    )
+    conn.execute(
+        "INSERT INTO users VALUES (2, 'bob', 0, NULL, NULL, 0, 0, ?, ?)",
+        (CREATED_AT, CREATED_AT)
+    )
+    conn.execute(
+        "INSERT INTO quiz_sessions VALUES ('s1', 1, 'daily', NULL, '[]', 4, 5, ?)",
+        (UPDATED_AT,)
+    )
+    conn.execute(
+        "INSERT INTO user_answers (user_id, session_id, question_text, user_answer, "
+        "correct_answer, is_correct, answered_at) VALUES (1, 's1', 'Q', 'A', 'A', 1, ?)",
+        (UPDATED_AT,)
+    )
+    conn.commit()
+    conn.close()
+
+
+async def open_manager(path) -> DatabaseManager:
+    manager = DatabaseManager()
+    manager.db_path = str(path)
+    assert await manager.initialize()
+    return manager
+
+
+async def test_migrate_converts_iso_timestamps_to_epoch(tmp_path):
+    path = tmp_path / 'quiz_bot.db'
+    build_old_database(path)
+    
+    manager = await open_manager(path)
+    try:
+        state = await manager.get_user_state(1)
+    finally:
+        await manager.close()
+    
+    assert state.last_daily_reset == epoch(RESET_AT)
+    assert state.last_daily_reset_day == 20240301
+    assert state.created_at == epoch(CREATED_AT)
+    assert state.updated_at == epoch(UPDATED_AT)
+    assert state.daily_questions_completed == 3
+    assert state.total_correct_answers == 15
+    
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+        assert conn.execute(
+            "SELECT completed_at FROM quiz_sessions WHERE session_id = 's1'"
+        ).fetchone()[0] == epoch(UPDATED_AT)
+        assert conn.execute(
+            "SELECT answered_at, is_correct FROM user_answers"
+        ).fetchone() == (epoch(UPDATED_AT), 1)
+        indexes = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        assert {'idx_qs_user', 'idx_ua_user_session'} <= indexes
+    finally:
+        conn.close()
+
+
+async def test_migrate_leaves_missing_reset_null(tmp_path):
+    path = tmp_path / 'quiz_bot.db'
+    build_old_database(path)
+    
+    manager = await open_manager(path)
+    await manager.close()
+    
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(
+            "SELECT last_daily_reset, last_daily_reset_day, created_at FROM users WHERE user_id = 2"
+        ).fetchone()
+    finally:
+        conn.close()
+    assert row == (None, None, epoch(CREATED_AT))
+
+
+async def test_migrate_is_idempotent(tmp_path):
+    path = tmp_path / 'quiz_bot.db'
+    build_old_database(path)
+    
+    await (await open_manager(path)).close()
+    manager = await open_manager(path)
+    try:
+        state = await manager.get_user_state(1)
+    finally:
+        await manager.close()
+    
+    assert state.last_daily_reset == epoch(RESET_AT)
+    assert state.last_daily_reset_day == 20240301
+
+
+async def test_initialize_fresh_database(tmp_path):
+    path = tmp_path / 'quiz_bot.db'
+    
+    await (await open_manager(path)).close()
+    manager = await open_manager(path)
+    try:
+        assert await manager.create_or_update_user(1, 'alice')
+        state = await manager.get_user_state(1)
+    finally:
+        await manager.close()
+    
+    assert isinstance(state.created_at, int)
+
+
+def give_null_day_user_progress(path):
+    """Mark the user without a reset date as part-way through a daily quiz."""
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE users SET daily_questions_completed = 3 WHERE user_id = 2")
+    conn.commit()
+    conn.close()
+
+
+async def test_bulk_reset_daily_includes_null_reset_day(tmp_path):
+    path = tmp_path / 'quiz_bot.db'
+    build_old_database(path)
+    give_null_day_user_progress(path)
+    
+    manager = await open_manager(path)
+    try:
+        reset_count = await manager.bulk_reset_daily()
+        state = await manager.get_user_state(2)
+    finally:
+        await manager.close()
+    
+    # Both users were last reset before today; user 2 never was
+    assert reset_count == 2
+    assert state.last_daily_reset_day == day_number(datetime.now(timezone.utc))
+    assert state.daily_questions_completed == 0
+
+
+async def test_get_user_state_for_today_stores_reset_for_null_reset_day(tmp_path):
+    path = tmp_path / 'quiz_bot.db'
+    build_old_database(path)
+    give_null_day_user_progress(path)
+    today = day_number(datetime.now(timezone.utc))
+    
+    manager = await open_manager(path)
+    try:
+        state = await manager.get_user_state_for_today(2)
+    finally:
+        await manager.close()
+    
+    assert state.last_daily_reset_day == today
+    assert state.daily_questions_completed == 0
+    
+    # The reset was written, not just reported
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute(
+            "SELECT last_daily_reset_day, daily_questions_completed FROM users WHERE user_id = 2"
+        ).fetchone()
+    finally:
+        conn.close()
+    assert row == (today, 0)
+
+
+async def test_finalize_quiz_stores_questions_without_correct_norm(tmp_path):
+    question = Question(
+        topic='grammar', question='Pick one', option_a='a', option_b='b',
+        option_c='', option_d='d', correct_answer='b', correct_norm='B', explanation='Because'
+    )
+    session = QuizSession(
+        session_id='s2', user_id=1, session_type='practice', topic='grammar',
+        questions=[question], current_question_index=1, correct_answers=1,
+        answers_given=bytearray(b'B'), started_at=datetime.now(timezone.utc), is_completed=True
+    )
+    
+    manager = await open_manager(tmp_path / 'quiz_bot.db')
+    try:
+        assert await manager.create_or_update_user(1, 'alice')
+        assert await manager.finalize_quiz(session)
+    finally:
+        await manager.close()
+    
+    conn = sqlite3.connect(tmp_path / 'quiz_bot.db')
+    try:
+        questions_data = conn.execute(
+            "SELECT questions_data FROM quiz_sessions WHERE session_id = 's2'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert json.loads(questions_data) == [{
+        'topic': 'grammar', 'question': 'Pick one', 'option_a': 'a', 'option_b': 'b',
+        'option_c': '', 'option_d': 'd', 'correct_answer': 'b', 'explanation': 'Because'
+    }]
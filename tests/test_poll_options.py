@@ -0,0 +1,53 @@
+"""Tests for mapping questions to poll options and poll answers back to letters."""
+
+from bot import get_poll_options, poll_option_letter
+from database import Question
+
+
+def make_question(options, correct_answer):
+    option_a, option_b, option_c, option_d = options
+    return Question(
+        topic='grammar',
+        question='Pick one',
+        option_a=option_a,
+        option_b=option_b,
+        option_c=option_c,
+        option_d=option_d,
+        correct_answer=correct_answer,
+        correct_norm=correct_answer.upper(),
+        explanation=''
+    )
+
+
+def test_full_option_set():
+    question = make_question(('a', 'b', 'c', 'd'), 'C')
+    
+    assert get_poll_options(question) == (['a', 'b', 'c', 'd'], 2)
+    assert poll_option_letter(question, 2) == 'C'
+
+
+def test_gapped_option_set_round_trips():
+    question = make_question(('a', 'b', '', 'd'), 'D')
+    
+    options, correct_option_id = get_poll_options(question)
+    
+    assert options == ['a', 'b', 'd']
+    assert correct_option_id == 2
+    assert poll_option_letter(question, correct_option_id) == 'D'
+    assert [poll_option_letter(question, i) for i in range(3)] == ['A', 'B', 'D']
+
+
+def test_answer_naming_an_empty_option_is_invalid():
+    question = make_question(('', 'b', 'c', 'd'), 'A')
+    
+    assert get_poll_options(question) == (['b', 'c', 'd'], None)
+
+
+def test_out_of_range_poll_index():
+    question = make_question(('a', 'b', '', ''), 'A')
+    
+    assert poll_option_letter(question, 2) == ''
+
+
+def test_no_current_question_falls_back_to_plain_letters():
+    assert poll_option_letter(None, 1) == 'B'
@@ -0,0 +1,89 @@
+"""Tests for the per-chat send limiter."""
+
+import asyncio
+
+from aiogram.methods import GetMe, SendMessage
+
+from rate_limiter import ChatRateLimiter, RateLimitMiddleware
+
+PERIOD = 0.2
+# Slack for event loop scheduling when comparing times
+TOLERANCE = 0.05
+
+
+async def send_times(limiter: ChatRateLimiter, chat_id: int, count: int):
+    """Send count messages to a chat and return when each got its slot, from the start."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    times = []
+    for _ in range(count):
+        async with limiter.limit(chat_id):
+            times.append(loop.time() - start)
+    return times
+
+
+async def test_sends_within_window_do_not_wait():
+    limiter = ChatRateLimiter(private_limit=(3, PERIOD))
+    
+    times = await send_times(limiter, 42, 3)
+    
+    assert times[-1] < TOLERANCE
+
+
+async def test_send_over_limit_waits_for_oldest_to_expire():
+    limiter = ChatRateLimiter(private_limit=(2, PERIOD))
+    
+    times = await send_times(limiter, 42, 4)
+    
+    assert times[1] < TOLERANCE
+    assert PERIOD - TOLERANCE <= times[2] < PERIOD + TOLERANCE
+    assert PERIOD - TOLERANCE <= times[3] < PERIOD + TOLERANCE
+
+
+async def test_group_chats_use_group_limit():
+    limiter = ChatRateLimiter(private_limit=(1, PERIOD), group_limit=(3, PERIOD))
+    
+    group_times = await send_times(limiter, -100, 3)
+    private_times = await send_times(limiter, 42, 2)
+    
+    assert group_times[-1] < TOLERANCE
+    assert private_times[1] >= PERIOD - TOLERANCE
+
+
+async def test_chats_are_limited_independently():
+    limiter = ChatRateLimiter(private_limit=(1, PERIOD))
+    
+    await send_times(limiter, 1, 1)
+    times = await send_times(limiter, 2, 1)
+    
+    assert times[0] < TOLERANCE
+
+
+async def test_sends_to_a_chat_keep_call_order():
+    limiter = ChatRateLimiter(private_limit=(1, PERIOD))
+    order = []
+    
+    async def send(n):
+        async with limiter.limit(42):
+            order.append(n)
+    
+    await asyncio.gather(*(send(n) for n in range(3)))
+    
+    assert order == [0, 1, 2]
+
+
+async def test_middleware_limits_chat_sends_only():
+    limiter = ChatRateLimiter(private_limit=(1, PERIOD))
+    middleware = RateLimitMiddleware(limiter)
+    loop = asyncio.get_running_loop()
+    
+    async def make_request(bot, method):
+        return loop.time()
+    
+    start = loop.time()
+    await middleware(make_request, None, SendMessage(chat_id=42, text="one"))
+    unlimited = await middleware(make_request, None, GetMe())
+    limited = await middleware(make_request, None, SendMessage(chat_id=42, text="two"))
+    
+    assert unlimited - start < TOLERANCE
+    assert limited - start >= PERIOD - TOLERANCE
@@ -0,0 +1,48 @@
+"""Tests for render_markup's plain text and message entities."""
+
+from bot import WELCOME_ENTITIES, WELCOME_TEXT, render_markup
+
+
+def entity_tuples(entities):
+    return [(entity.type, entity.offset, entity.length) for entity in entities]
+
+
+def utf16_slice(text: str, offset: int, length: int) -> str:
+    """Cut text the way Telegram applies an entity, in UTF-16 code units."""
+    encoded = text.encode('utf-16-le')
+    return encoded[offset * 2:(offset + length) * 2].decode('utf-16-le')
+
+
+def test_plain_text_has_no_entities():
+    assert render_markup("No markup here") == ("No markup here", [])
+
+
+def test_bold_and_code_spans():
+    text, entities = render_markup("Use **bold** and `/code` now")
+    
+    assert text == "Use bold and /code now"
+    assert entity_tuples(entities) == [("bold", 4, 4), ("code", 13, 5)]
+
+
+def test_offsets_count_utf16_code_units():
+    # Emoji outside the BMP take two UTF-16 code units each
+    text, entities = render_markup("🎯 **Welcome!** 📚 `/practice` 🎯")
+    
+    assert text == "🎯 Welcome! 📚 /practice 🎯"
+    assert entity_tuples(entities) == [("bold", 3, 8), ("code", 15, 9)]
+    assert [utf16_slice(text, e.offset, e.length) for e in entities] == ["Welcome!", "/practice"]
+
+
+def test_emoji_inside_span_counts_toward_length():
+    text, entities = render_markup("**📊 Stats**")
+    
+    assert text == "📊 Stats"
+    assert entity_tuples(entities) == [("bold", 0, 8)]
+
+
+def test_welcome_text_entities_cover_their_spans():
+    spans = [utf16_slice(WELCOME_TEXT, e.offset, e.length) for e in WELCOME_ENTITIES]
+    
+    assert "**" not in WELCOME_TEXT and "`" not in WELCOME_TEXT
+    assert spans[0] == "Welcome to the English Quiz Bot!"
+    assert "/practice" in spans